@@ -1,20 +1,92 @@
+"""
+Application Configuration Module
+================================
+Environment-based configuration for the AI Support Desk.
+
+All environment variables are read exactly once, at import time, into a
+frozen Config object. The rest of the app reads attributes from it instead
+of calling os.environ.get() on every request.
+
+Settings saved through the Settings page (stored in the database) still take
+priority over these values; this module only provides the fallbacks.
+
+USAGE:
+    from app import config
+    host = config.settings.imap_host   # or the alias: config.IMAP_HOST
+"""
+
+import functools
 import os
+from dataclasses import dataclass
+from typing import Optional
 from dotenv import load_dotenv
 
-# Load environment variables from .env file if it exists
-load_dotenv()
 
-DATABASE_URL = os.environ.get("DATABASE_URL")
-SESSION_SECRET = os.environ.get("SESSION_SECRET", "default-secret-key")
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+@functools.lru_cache(maxsize=1)
+def load_env() -> None:
+    """
+    Load environment variables from the .env file if it exists.
+    
+    Cached so the file is parsed at most once per process, no matter how
+    many modules call it. Variables already set in the real environment
+    are never overridden.
+    """
+    load_dotenv(override=False)
+
+
+load_env()
+
+
+@dataclass(frozen=True)
+class _Config:
+    database_url: Optional[str]
+    session_secret: str
+    openai_api_key: Optional[str]
+
+    imap_host: str
+    imap_port: int
+    imap_username: str
+    imap_password: str
+
+    smtp_host: str
+    smtp_port: int
+    smtp_username: str
+    smtp_password: str
+    smtp_from_email: str
+
+    slack_webhook_url: Optional[str]
+
+
+settings = _Config(
+    database_url=os.environ.get("DATABASE_URL"),
+    session_secret=os.environ.get("SESSION_SECRET", "default-secret-key"),
+    openai_api_key=os.environ.get("OPENAI_API_KEY"),
+    imap_host=os.environ.get("IMAP_HOST", ""),
+    imap_port=int(os.environ.get("IMAP_PORT", "993")),
+    imap_username=os.environ.get("IMAP_USERNAME", ""),
+    imap_password=os.environ.get("IMAP_PASSWORD", ""),
+    smtp_host=os.environ.get("SMTP_HOST", ""),
+    smtp_port=int(os.environ.get("SMTP_PORT", "587")),
+    smtp_username=os.environ.get("SMTP_USERNAME", ""),
+    smtp_password=os.environ.get("SMTP_PASSWORD", ""),
+    smtp_from_email=os.environ.get("SMTP_FROM_EMAIL", ""),
+    slack_webhook_url=os.environ.get("SLACK_WEBHOOK_URL"),
+)
+
+# Module-level aliases for code that prefers plain constants
+DATABASE_URL = settings.database_url
+SESSION_SECRET = settings.session_secret
+OPENAI_API_KEY = settings.openai_api_key
+
+IMAP_HOST = settings.imap_host
+IMAP_PORT = settings.imap_port
+IMAP_USERNAME = settings.imap_username
+IMAP_PASSWORD = settings.imap_password
 
-IMAP_HOST = os.environ.get("IMAP_HOST", "")
-IMAP_PORT = int(os.environ.get("IMAP_PORT", "993"))
-IMAP_USERNAME = os.environ.get("IMAP_USERNAME", "")
-IMAP_PASSWORD = os.environ.get("IMAP_PASSWORD", "")
+SMTP_HOST = settings.smtp_host
+SMTP_PORT = settings.smtp_port
+SMTP_USERNAME = settings.smtp_username
+SMTP_PASSWORD = settings.smtp_password
+SMTP_FROM_EMAIL = settings.smtp_from_email
 
-SMTP_HOST = os.environ.get("SMTP_HOST", "")
-SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
-SMTP_USERNAME = os.environ.get("SMTP_USERNAME", "")
-SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD", "")
-SMTP_FROM_EMAIL = os.environ.get("SMTP_FROM_EMAIL", "")
+SLACK_WEBHOOK_URL = settings.slack_webhook_url
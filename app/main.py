@@ -14,8 +14,11 @@ This file:
 HOW THE APP STARTS:
 1. run_backend.py imports this module
 2. Base.metadata.create_all() creates any missing database tables
-3. lifespan() runs on startup (checks if scheduler should start)
-4. Routes are registered and the server starts listening
+   (skipped when DB_CREATE_ALL=0)
+3. Routes are registered when this module is imported
+4. lifespan() runs on startup and starts seeding/scheduler checks in the
+   background
+5. The server starts listening (without waiting for step 4's background work)
 
 ARCHITECTURE:
 - Backend runs on port 8000 (via Uvicorn)
@@ -30,16 +33,22 @@ TROUBLESHOOTING:
 """
 
 import os
+import asyncio
+import hashlib
+from pathlib import Path
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import Response, ORJSONResponse
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from app.database import engine, Base, SessionLocal
 from app.routes import tickets, settings, templates, knowledge, surveys, team, views, auth
 from app.models import Settings as SettingsModel
 from app.services.scheduler_service import start_scheduler
+from sqlalchemy import select, text
 from app.init_data import init_default_data
 
 # ============================================================================
@@ -48,7 +57,114 @@ from app.init_data import init_default_data
 # Create all database tables defined in models.py
 # This is safe to run multiple times - it only creates tables that don't exist
 # Note: This does NOT handle migrations; new columns require manual handling
-Base.metadata.create_all(bind=engine)
+#
+# Each call checks every table against pg_catalog. Once the schema exists,
+# set DB_CREATE_ALL=0 in production to skip those queries on every worker boot.
+if os.environ.get("DB_CREATE_ALL", "1") == "1":
+    Base.metadata.create_all(bind=engine)
+    
+    # Materialized view behind the analytics charts (see stats_service.py)
+    from app.services.stats_service import create_stats_view
+    create_stats_view(engine)
+
+
+# ============================================================================
+# STARTUP TASKS
+# ============================================================================
+# Arbitrary constant identifying the "seed default data" advisory lock
+SEED_LOCK_ID = 727001
+
+
+def get_scheduler_env_config():
+    """
+    Read the scheduler overrides from SCHEDULER_ENABLED / SCHEDULER_INTERVAL_MINUTES.
+    
+    Returns only the keys whose variable is set, so each one overrides just
+    its own setting. Anything missing here comes from the settings table
+    (managed from the Settings page).
+    """
+    config = {}
+    enabled = os.environ.get("SCHEDULER_ENABLED")
+    if enabled is not None:
+        config["scheduler_enabled"] = "true" if enabled.lower() in ("1", "true", "yes") else "false"
+    interval = os.environ.get("SCHEDULER_INTERVAL_MINUTES")
+    if interval is not None:
+        config["scheduler_interval_minutes"] = interval
+    return config
+
+
+def run_startup_tasks():
+    """
+    Seed default data, start the scheduler if it is enabled, and start
+    the analytics view refresher.
+    
+    Runs in a worker thread after the app has started (see lifespan), so
+    slow database queries here never delay the first request.
+    
+    With several Uvicorn workers only one of them seeds: the others fail
+    to get the advisory lock and skip straight to the scheduler check.
+    The scheduler and refresher are started even if seeding fails.
+    The lock is transaction-scoped, so it is released by the commit in
+    init_default_data().
+    """
+    db = SessionLocal()
+    try:
+        # Each step has its own error handling, so a failure in one (e.g.
+        # seeding on a database that needs a manual migration) never stops
+        # email ingestion or the analytics refresher from starting.
+        
+        # Initialize default data (Templates & Knowledge Base)
+        try:
+            got_lock = db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:lock_id)"), {"lock_id": SEED_LOCK_ID}
+            ).scalar()
+            if got_lock:
+                init_default_data(db)
+            else:
+                db.rollback()
+                print("[Startup] Another worker is seeding default data, skipping")
+        except Exception as e:
+            # Leave the session usable for the scheduler check below
+            db.rollback()
+            print(f"[Startup] Seeding default data failed: {e}")
+
+        # Check if scheduler is enabled and start it
+        try:
+            start_scheduler_if_enabled(db)
+        except Exception as e:
+            db.rollback()
+            print(f"[Startup] Starting the auto-fetch scheduler failed: {e}")
+        
+        # Keep the analytics materialized view fresh
+        try:
+            from app.services.stats_service import start_stats_refresher
+            start_stats_refresher()
+        except Exception as e:
+            print(f"[Startup] Starting the stats refresher failed: {e}")
+    finally:
+        db.close()
+
+
+def start_scheduler_if_enabled(db):
+    """Start the auto-fetch scheduler if the environment or Settings page enables it."""
+    # Environment first, then settings table for whatever it leaves unset
+    scheduler_config = get_scheduler_env_config()
+    missing = [
+        key for key in ("scheduler_enabled", "scheduler_interval_minutes")
+        if key not in scheduler_config
+    ]
+    if missing:
+        # Remaining keys in one query
+        scheduler_config.update(
+            db.execute(
+                select(SettingsModel.key, SettingsModel.value).where(SettingsModel.key.in_(missing))
+            ).all()
+        )
+    
+    if scheduler_config.get("scheduler_enabled") == "true":
+        interval = int(scheduler_config.get("scheduler_interval_minutes") or 5)
+        start_scheduler(interval)
+        print(f"[Startup] Auto-fetch scheduler started with {interval} minute interval")
 
 
 # ============================================================================
@@ -61,36 +177,35 @@ async def lifespan(app: FastAPI):
     
     This function runs:
     - On startup: Before the code block (before yield)
-    - On shutdown: After the code block (after yield, not implemented here)
+    - On shutdown: After the code block (after yield)
     
     Currently used to:
-    - Check if the email auto-fetch scheduler should be started
-    - Start the scheduler with the configured interval
+    - Kick off run_startup_tasks() in the background, which seeds default
+      data and starts the scheduler if it is enabled
+    - Close the shared Google OAuth HTTP client and pooled SMTP
+      connections, and stop the analytics view refresher, on shutdown
     
     The scheduler runs in a background thread and periodically
     fetches new emails from the configured IMAP inbox.
     """
-    db = SessionLocal()
-    try:
-        # Initialize default data (Templates & Knowledge Base)
-        init_default_data(db)
-
-        # Check if scheduler is enabled in settings
-        scheduler_enabled = db.query(SettingsModel).filter(SettingsModel.key == "scheduler_enabled").first()
-        scheduler_interval = db.query(SettingsModel).filter(SettingsModel.key == "scheduler_interval_minutes").first()
-        
-        # Start scheduler if enabled
-        if scheduler_enabled and scheduler_enabled.value == "true":
-            interval = int(scheduler_interval.value) if scheduler_interval else 5
-            start_scheduler(interval)
-            print(f"[Startup] Auto-fetch scheduler started with {interval} minute interval")
-    finally:
-        db.close()
+    # Seeding and the scheduler check run in the background so the server
+    # can start accepting requests straight away. Keep a reference to the
+    # task so it isn't garbage collected before it finishes.
+    app.state.startup_task = asyncio.create_task(asyncio.to_thread(run_startup_tasks))
     
     # Yield control to the application
-    # Everything after this would run on shutdown
+    # Everything after this runs on shutdown
     yield
 
+    from app.routes.auth import close_google_client
+    await close_google_client()
+
+    from app.services.smtp_service import close_smtp_connections
+    await asyncio.to_thread(close_smtp_connections)
+
+    from app.services.stats_service import stop_stats_refresher
+    stop_stats_refresher()
+
 
 # ============================================================================
 # FASTAPI APPLICATION
@@ -100,7 +215,9 @@ app = FastAPI(
     title="AI Support Desk",
     description="AI-powered email support ticket system for InfinityWork IT Solutions",
     version="1.0.0",
-    lifespan=lifespan  # Use our lifecycle manager
+    lifespan=lifespan,  # Use our lifecycle manager
+    # Serialize JSON responses with orjson (much faster on large ticket lists)
+    default_response_class=ORJSONResponse,
 )
 
 # ============================================================================
@@ -114,13 +231,25 @@ app = FastAPI(
 #   - Backend: http://localhost:8000
 # 
 # Without CORS, browsers block cross-origin requests for security.
-# This configuration allows all origins ("*") for simplicity.
+#
+# Allowed origins come from CORS_ORIGINS (comma-separated). An explicit
+# list lets Starlette answer with a fixed header instead of echoing the
+# request's Origin back, which it has to do for "*" with credentials.
+# In production the frontend is served by this app (same origin), so
+# CORS only matters for a separately hosted frontend.
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.environ.get("CORS_ORIGINS", "http://localhost:5000").split(",")
+    if origin.strip()
+]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],       # Allow requests from any origin
-    allow_credentials=True,    # Allow cookies/auth headers
-    allow_methods=["*"],       # Allow all HTTP methods (GET, POST, etc.)
-    allow_headers=["*"],       # Allow all headers
+    allow_origins=CORS_ORIGINS,   # Only these frontends may call the API
+    allow_credentials=True,       # Allow cookies/auth headers
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+    allow_headers=["*"],          # Allow all headers
+    expose_headers=["X-Next-Cursor"],  # Pagination cursor (knowledge article list)
 )
 
 # ============================================================================
@@ -147,6 +276,7 @@ app.include_router(surveys.router)
 app.include_router(team.router)
 app.include_router(views.router)
 
+
 # ============================================================================
 # STATIC FILE SERVING (PRODUCTION MODE)
 # ============================================================================
@@ -154,40 +284,76 @@ app.include_router(views.router)
 # The Vite build process creates this directory.
 #
 # How it works:
-# 1. Mount /assets to serve JavaScript, CSS, and other static files
-# 2. For all other routes (except /api/*), serve index.html
-# 3. React Router then handles client-side routing
+# 1. client/dist is mounted at "/" after all API routers, so /api/* always
+#    matches a router first
+# 2. Files that exist (JS, CSS, images, index.html) are served directly
+# 3. Any other path (except /api/*) falls back to index.html
+# 4. React Router then handles client-side routing
 #
 # This is called "SPA (Single Page Application) mode" because
 # the same HTML file handles all frontend routes.
-if os.path.exists("client/dist"):
-    # Serve static assets (JS, CSS, images) from the Vite build
-    app.mount("/assets", StaticFiles(directory="client/dist/assets"), name="assets")
+#
+# The build paths are resolved once here, at import time.
+CLIENT_DIST = Path("client/dist")
+CLIENT_DIST_EXISTS = CLIENT_DIST.is_dir()
+INDEX_PATH = CLIENT_DIST / "index.html"
+
+
+class SPAStaticFiles(StaticFiles):
+    """
+    StaticFiles that falls back to index.html for unknown paths.
     
-    @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
-        """
-        Serve the React SPA for all non-API routes.
-        
-        This enables client-side routing:
-        - /tickets, /settings, etc. all load index.html
-        - React Router reads the URL and shows the right component
-        - /api/* routes are handled by the API routers above
-        """
-        # Don't intercept API routes
-        if full_path.startswith("api/"):
-            return None
-        # Return the React app's entry point
-        return FileResponse("client/dist/index.html")
-else:
-    # Development mode: just show a simple API status message
-    # The frontend runs separately on its own dev server
-    @app.get("/")
-    def root():
-        """
-        Root endpoint for development mode.
-        
-        When the built frontend doesn't exist, just return
-        a JSON message confirming the API is running.
-        """
-        return {"message": "AI Support Desk API", "status": "running"}
+    This enables client-side routing:
+    - /tickets, /settings, etc. all load index.html
+    - React Router reads the URL and shows the right component
+    - Unknown /api/* paths still return a 404 instead of the HTML page
+    
+    index.html only changes on a rebuild (which restarts the server),
+    so the fallback is served from memory with an ETag.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.index_html = INDEX_PATH.read_bytes()
+        self.index_headers = {
+            "ETag": f'"{hashlib.md5(self.index_html).hexdigest()}"',
+            "Cache-Control": "no-cache",
+        }
+
+    async def get_response(self, path: str, scope):
+        try:
+            return await super().get_response(path, scope)
+        except StarletteHTTPException as e:
+            if e.status_code != 404 or path == "api" or path.startswith("api/"):
+                raise
+        # Browser already has this version
+        if Headers(scope=scope).get("if-none-match") == self.index_headers["ETag"]:
+            return Response(status_code=304, headers=self.index_headers)
+        return Response(content=self.index_html, media_type="text/html", headers=self.index_headers)
+
+
+def register_frontend_routes(app: FastAPI):
+    """
+    Register the frontend routes: the built SPA in production, or a
+    simple status endpoint in development.
+    
+    Must run after the API routers are included (see API ROUTES above).
+    """
+    if CLIENT_DIST_EXISTS:
+        # Serve the Vite build; must be mounted last so it never shadows the API
+        app.mount("/", SPAStaticFiles(directory=str(CLIENT_DIST), html=True), name="spa")
+    else:
+        # Development mode: just show a simple API status message
+        # The frontend runs separately on its own dev server
+        @app.get("/")
+        def root():
+            """
+            Root endpoint for development mode.
+            
+            When the built frontend doesn't exist, just return
+            a JSON message confirming the API is running.
+            """
+            return {"message": "AI Support Desk API", "status": "running"}
+
+
+# Registered after the API routers so the SPA mount at "/" never shadows them
+register_frontend_routes(app)
@@ -26,15 +26,54 @@ TROUBLESHOOTING:
 - "Table already exists": The table was created before; this is usually fine
 - "Column not found": A migration may be needed if you added new columns
 - IntegrityError: You're trying to violate a constraint (unique, foreign key, etc.)
+- Slow ticket list on an existing database: create_all() only creates indexes
+  for tables it creates, so indexes added later to __table_args__ must be
+  created by hand (CREATE INDEX CONCURRENTLY ... to avoid locking the table)
+- Same for the fillfactor on tickets/settings (see HOT_UPDATE_FILLFACTOR):
+  ALTER TABLE tickets SET (fillfactor = 80); only new pages use it until
+  the table is rewritten (VACUUM FULL or pg_repack)
+- "operator class gin_trgm_ops does not exist": the database user can't
+  create the pg_trgm extension; run CREATE EXTENSION pg_trgm as a superuser
+- "'Ticket.messages' is not available due to lazy='raise'": the query must
+  eager-load it, e.g. .options(selectinload(Ticket.messages))
 """
 
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import DDL, event, Column, Integer, BigInteger, String, Text, DateTime, Boolean, ForeignKey, Enum, Index, UniqueConstraint, func, literal_column, text
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 import enum
 from app.database import Base
 
 
+# ============================================================================
+# TIMESTAMP DEFAULTS
+# ============================================================================
+def utc_now():
+    """
+    SQL expression for the current UTC time, used as a column default.
+    
+    Rendered into the INSERT/UPDATE statement itself, so the database fills
+    in timestamps (no Python clock call per row, and bulk inserts need no
+    per-row Python work). Being part of the statement rather than a
+    server_default, it also works on tables created before this change.
+    
+    clock_timestamp() rather than now(): now() is frozen at transaction
+    start, which would give every message inserted in one batch the same
+    created_at and break thread ordering.
+    """
+    return func.timezone("utc", func.clock_timestamp())
+
+
+# ============================================================================
+# COLUMN LENGTHS
+# ============================================================================
+# Email addresses are at most 254 characters (RFC 5321). Subjects are cut to
+# 255 at ingest; longer ones are rare and only the start is ever displayed.
+# Keeping these columns narrow keeps index keys small.
+MAX_EMAIL_LENGTH = 254
+MAX_SUBJECT_LENGTH = 255
+
+
 # ============================================================================
 # ENUM TYPES
 # ============================================================================
@@ -105,14 +144,36 @@ class Settings(Base):
     Example entries:
         key: "imap_host", value: "imap.gmail.com"
         key: "scheduler_enabled", value: "true"
-        key: "admin_password", value: "(hashed password)"
+        key: "admin_password", value: "(bcrypt hash)"
     """
     __tablename__ = "settings"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     key = Column(String(100), unique=True, nullable=False, index=True)
     value = Column(Text, nullable=True)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=utc_now(), onupdate=utc_now())
+
+
+# ============================================================================
+# TABLE STORAGE PARAMETERS
+# ============================================================================
+# Tables whose rows are updated over and over (tickets go through AI
+# processing, assignment, SLA refreshes and approval; settings are
+# overwritten in place) leave part of each page free. An update can then
+# write the new row version on the same page (a HOT update) instead of
+# moving it and touching every index. SQLAlchemy 2.0 has no Table option
+# for WITH (fillfactor = ...), so it is applied right after CREATE TABLE.
+HOT_UPDATE_FILLFACTOR = 80
+
+
+def _set_fillfactor(table):
+    event.listen(
+        table, "after_create",
+        DDL(f"ALTER TABLE {table.name} SET (fillfactor = {HOT_UPDATE_FILLFACTOR})")
+    )
+
+
+_set_fillfactor(Settings.__table__)
 
 
 # ============================================================================
@@ -143,16 +204,55 @@ class Ticket(Base):
     - approval_status: PENDING/APPROVED/REJECTED
     - assigned_to: Which team member is handling this ticket
     - sla_deadline: When the ticket must be resolved by
+    
+    INDEXES:
+    The dashboard and saved views filter on several columns at once, so the
+    composite indexes below match those filter combinations (equality
+    columns first, range/sort column last) instead of indexing each column
+    on its own.
+    
+    The partial indexes only cover the small "open" subset of tickets
+    (pending, breached, unassigned, not yet sent), so they stay small
+    enough to live in memory however many closed tickets pile up.
     """
     __tablename__ = "tickets"
+    __table_args__ = (
+        # Ticket list filters: status, then optional urgency/category
+        Index("ix_tickets_status_urgency_category", "approval_status", "urgency", "category"),
+        # Ticket list filtered by status only, newest first (scanned backwards)
+        Index("ix_tickets_status_received", "approval_status", "received_at"),
+        # "My tickets" / unassigned filters combined with status
+        Index("ix_tickets_assignee_status", "assigned_to", "approval_status"),
+        # SLA breach checks: not-yet-breached tickets past their deadline
+        Index("ix_tickets_sla", "sla_breached", "sla_deadline"),
+        # Priority queue ordering
+        Index("ix_tickets_priority_received", "priority_score", "received_at"),
+        
+        # Partial indexes for the open-ticket hot set
+        Index("ix_tickets_pending_deadline", "sla_deadline",
+              postgresql_where=text("approval_status = 'PENDING'")),
+        Index("ix_tickets_breached", "received_at",
+              postgresql_where=text("sla_breached = true")),
+        Index("ix_tickets_unassigned", "received_at",
+              postgresql_where=text("assigned_to IS NULL")),
+        # Active tickets as filtered by sla_service (priority queue, SLA summary)
+        Index("ix_tickets_active_priority", "priority_score",
+              postgresql_where=text("sent_at IS NULL AND approval_status <> 'REJECTED'")),
+        
+        # Time-range filters ("last 30 days", today's counts). Tickets arrive
+        # roughly in received_at order, so a tiny BRIN index is enough here
+        # instead of a full B-tree
+        Index("ix_tickets_received_brin", "received_at",
+              postgresql_using="brin", postgresql_with={"pages_per_range": 32}),
+    )
 
     # Primary identifier
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True)  # Tickets grow without bound
     
     # Customer and email information
-    sender_email = Column(String(255), nullable=False, index=True)
-    subject = Column(String(500), nullable=False)
-    received_at = Column(DateTime, default=datetime.utcnow, index=True)
+    sender_email = Column(String(MAX_EMAIL_LENGTH), nullable=False, index=True)
+    subject = Column(String(MAX_SUBJECT_LENGTH), nullable=False)
+    received_at = Column(DateTime, default=utc_now())
     
     # AI-generated analysis fields
     # These are populated by ai_service.py when processing the ticket
@@ -164,7 +264,7 @@ class Ticket(Base):
     
     # Approval workflow fields
     # No response is sent without human approval
-    approval_status = Column(String(20), default=ApprovalStatus.PENDING.value, index=True)
+    approval_status = Column(String(20), default=ApprovalStatus.PENDING.value)
     approved_by = Column(String(255), nullable=True)   # Email/name of approver
     approved_at = Column(DateTime, nullable=True)      # When approval was given
     sent_at = Column(DateTime, nullable=True)          # When response was sent
@@ -186,19 +286,26 @@ class Ticket(Base):
     
     # SLA (Service Level Agreement) tracking
     # Used to ensure timely responses
-    sla_deadline = Column(DateTime, nullable=True, index=True)  # Must respond by this time
+    sla_deadline = Column(DateTime, nullable=True)  # Must respond by this time
     sla_breached = Column(Boolean, default=False)      # Did we miss the deadline?
-    priority_score = Column(Integer, default=0, index=True)  # For sorting by priority
+    priority_score = Column(Integer, default=0)  # For sorting by priority
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utc_now())
+    updated_at = Column(DateTime, default=utc_now(), onupdate=utc_now())
     
     # Relationships
     # messages: All messages in this ticket's conversation
     # assignee: The TeamMember this ticket is assigned to
-    messages = relationship("TicketMessage", back_populates="ticket", order_by="TicketMessage.created_at")
-    assignee = relationship("TeamMember", foreign_keys=[assigned_to])
+    # Both are lazy="raise": a query that needs them must eager-load them
+    # (selectinload/joinedload), so serializing a list of tickets can never
+    # turn into one hidden SELECT per ticket.
+    messages = relationship("TicketMessage", back_populates="ticket",
+                            order_by="TicketMessage.created_at", lazy="raise")
+    assignee = relationship("TeamMember", foreign_keys=[assigned_to], lazy="raise")
+
+
+_set_fillfactor(Ticket.__table__)
 
 
 # ============================================================================
@@ -218,12 +325,22 @@ class TicketMessage(Base):
     stores the metadata and AI analysis.
     """
     __tablename__ = "ticket_messages"
-
-    id = Column(Integer, primary_key=True, index=True)
-    ticket_id = Column(Integer, ForeignKey("tickets.id"), nullable=False)
-    
-    sender_email = Column(String(255), nullable=False)
-    subject = Column(String(500), nullable=True)
+    __table_args__ = (
+        # A ticket's thread in order (Ticket.messages, "latest incoming
+        # message" lookups). Filters and sorts in one index, and the
+        # INCLUDE columns let thread summaries skip the table entirely.
+        Index("ix_ticket_messages_ticket_created", "ticket_id", "created_at",
+              postgresql_include=["is_incoming", "sender_email"]),
+        # Time-range scans across all messages (append-only, so BRIN fits)
+        Index("ix_ticket_messages_created_brin", "created_at",
+              postgresql_using="brin", postgresql_with={"pages_per_range": 32}),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    ticket_id = Column(BigInteger, ForeignKey("tickets.id"), nullable=False)
+    
+    sender_email = Column(String(MAX_EMAIL_LENGTH), nullable=False)
+    subject = Column(String(MAX_SUBJECT_LENGTH), nullable=True)
     body = Column(Text, nullable=False)  # The actual email content
     is_incoming = Column(Boolean, default=True)  # True=from customer, False=from agent
     
@@ -231,7 +348,7 @@ class TicketMessage(Base):
     message_id = Column(String(255), nullable=True)
     in_reply_to = Column(String(255), nullable=True)
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utc_now())
     
     # Back-reference to parent ticket
     ticket = relationship("Ticket", back_populates="messages")
@@ -258,13 +375,13 @@ class Template(Base):
     """
     __tablename__ = "templates"
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), nullable=False)      # Template name for selection
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False, unique=True)  # Template name for selection
     category = Column(String(50), nullable=True)    # Category it applies to
     content = Column(Text, nullable=False)          # The template text
     
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utc_now())
+    updated_at = Column(DateTime, default=utc_now(), onupdate=utc_now())
 
 
 # ============================================================================
@@ -283,17 +400,59 @@ class KnowledgeArticle(Base):
     - Category: Matching ticket category for relevance
     - Keywords: Comma-separated terms for matching
     - Content: The full article text with solution steps
+    
+    Search uses the GIN indexes defined below the class
+    (see knowledge_search_text and knowledge_search_vector).
     """
     __tablename__ = "knowledge_articles"
-
-    id = Column(Integer, primary_key=True, index=True)
-    title = Column(String(200), nullable=False)
+    __table_args__ = (
+        # Article list order and its keyset pagination (newest first;
+        # scanned backwards for DESC)
+        Index("ix_knowledge_articles_updated_id", "updated_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String(200), nullable=False, unique=True)
     category = Column(String(50), nullable=True, index=True)  # Matches ticket categories
     keywords = Column(Text, nullable=True)  # Comma-separated keywords for search
     content = Column(Text, nullable=False)  # Full article content
     
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utc_now())
+    updated_at = Column(DateTime, default=utc_now(), onupdate=utc_now())
+
+
+# Search text for an article: title + keywords + content.
+# The GIN indexes are built on these exact expressions, so queries must use
+# knowledge_search_text / knowledge_search_vector (not a hand-written
+# equivalent) for Postgres to pick the index. Literals are inlined so the
+# query and the index DDL render identical SQL. Plain || is used rather than
+# concat_ws(), which isn't IMMUTABLE and so can't be indexed.
+knowledge_search_text = (
+    func.coalesce(KnowledgeArticle.title, literal_column("''"))
+    .op("||")(literal_column("' '"))
+    .op("||")(func.coalesce(KnowledgeArticle.keywords, literal_column("''")))
+    .op("||")(literal_column("' '"))
+    .op("||")(func.coalesce(KnowledgeArticle.content, literal_column("''")))
+)
+
+# Full-text search document (word matching, used by suggestions)
+knowledge_search_vector = func.to_tsvector(literal_column("'english'"), knowledge_search_text)
+
+Index("ix_knowledge_articles_search", knowledge_search_vector, postgresql_using="gin")
+
+# Trigram index so the article list's substring search (ILIKE '%term%')
+# doesn't scan every article body. Needs the pg_trgm extension, which is
+# created just before the table.
+Index(
+    "ix_knowledge_articles_search_trgm",
+    knowledge_search_text.label("search_text"),
+    postgresql_using="gin",
+    postgresql_ops={"search_text": "gin_trgm_ops"},
+)
+event.listen(
+    KnowledgeArticle.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+)
 
 
 # ============================================================================
@@ -313,14 +472,14 @@ class TeamMember(Base):
     """
     __tablename__ = "team_members"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(100), nullable=False)      # Display name
     email = Column(String(255), unique=True, nullable=False, index=True)
     role = Column(String(50), default="agent")      # "agent", "supervisor", etc.
     is_active = Column(Boolean, default=True)       # Inactive members can't be assigned
     
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utc_now())
+    updated_at = Column(DateTime, default=utc_now(), onupdate=utc_now())
 
 
 # ============================================================================
@@ -338,21 +497,29 @@ class SatisfactionSurvey(Base):
     Survey responses help track support quality and identify issues.
     """
     __tablename__ = "satisfaction_surveys"
+    __table_args__ = (
+        # One survey per ticket; also serves as the index for ticket_id lookups
+        UniqueConstraint("ticket_id", name="uq_survey_ticket"),
+        # "Completed only" survey list, newest first
+        Index("ix_surveys_completed_created", "created_at",
+              postgresql_where=text("completed_at IS NOT NULL")),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    ticket_id = Column(Integer, ForeignKey("tickets.id"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    ticket_id = Column(BigInteger, ForeignKey("tickets.id"), nullable=False)
     
     rating = Column(Integer, nullable=False)  # 1-5 stars
     feedback = Column(Text, nullable=True)    # Optional written feedback
     customer_email = Column(String(255), nullable=False, index=True)
     
     # Token for anonymous survey submission
-    # Customers click a link with this token to submit feedback
-    survey_token = Column(String(100), unique=True, nullable=False, index=True)
+    # Customers click a link with this token to submit feedback.
+    # secrets.token_urlsafe(32) always produces 43 characters.
+    survey_token = Column(String(43), unique=True, nullable=False)
     sent_at = Column(DateTime, nullable=True)      # When survey email was sent
     completed_at = Column(DateTime, nullable=True)  # When customer responded
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utc_now())
 
 
 # ============================================================================
@@ -373,7 +540,7 @@ class SavedView(Base):
     """
     __tablename__ = "saved_views"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(100), nullable=False)  # Display name in menu
     
     # Filter criteria - any combination can be saved
@@ -387,8 +554,8 @@ class SavedView(Base):
     is_default = Column(Boolean, default=False)     # Show by default on load?
     sort_order = Column(Integer, default=0)         # Order in the menu
     
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utc_now())
+    updated_at = Column(DateTime, default=utc_now(), onupdate=utc_now())
 
 
 # ============================================================================
@@ -422,7 +589,7 @@ class User(Base):
     """
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String(255), unique=True, nullable=False, index=True)
     
     # Password authentication (for email/password login)
@@ -453,6 +620,17 @@ class User(Base):
     email_verified = Column(Boolean, default=False)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utc_now())
+    updated_at = Column(DateTime, default=utc_now(), onupdate=utc_now())
     last_login_at = Column(DateTime, nullable=True)  # Track user activity
+
+    @hybrid_property
+    def display_name(self):
+        """Full name for the UI, falling back to the email when no name is set."""
+        return f"{self.first_name or ''} {self.last_name or ''}".strip() or self.email
+
+    @display_name.expression
+    def display_name(cls):
+        # Same rule in SQL, so it can be selected/returned directly
+        full_name = func.trim(func.coalesce(cls.first_name, "") + " " + func.coalesce(cls.last_name, ""))
+        return func.coalesce(func.nullif(full_name, ""), cls.email)
@@ -10,30 +10,46 @@ It provides two authentication methods:
 IMPORTANT SECURITY NOTES:
 - Google OAuth requires GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET environment variables
 - The redirect URI must be registered in Google Cloud Console
-- OAuth state tokens are stored in memory to prevent CSRF attacks
+- OAuth state tokens are signed with STATE_SECRET to prevent CSRF attacks
+  (set it, identical on every worker, when running more than one worker)
 
 TROUBLESHOOTING:
 - If Google login fails with 403: Check that the redirect URI in Google Console matches exactly
+  (set OAUTH_DEBUG=1 to print the redirect URI being sent)
 - If "missing_params" error: The OAuth callback didn't receive the authorization code
-- If "invalid_state" error: The OAuth state token expired or was already used
+- If "invalid_state" error: The OAuth state token expired (10 minutes), or
+  STATE_SECRET is unset / differs between workers, or changed between login
+  and callback
 - If login opens in iframe but fails: Open the login URL in a new browser tab instead
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import HTMLResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+import base64
 import hashlib
+import hmac
+import orjson
 import os
 import httpx
 import secrets
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
 from urllib.parse import urlencode
 import bcrypt
 
 from app.database import get_db
-from app.models import Settings, User
+from app.models import User, utc_now
+from app.services.settings_service import get_all_settings, save_settings
 
 # Create a router for all authentication endpoints
 # All routes in this file will be prefixed with /api/auth
@@ -46,13 +62,128 @@ router = APIRouter(prefix="/api/auth", tags=["auth"])
 # You must create an "OAuth 2.0 Client ID" in the Google Cloud Console
 GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID", "")
 GOOGLE_CLIENT_SECRET = os.environ.get("GOOGLE_CLIENT_SECRET", "")
-GOOGLE_REDIRECT_URI = os.environ.get("REPLIT_DEV_DOMAIN", "")
 
-# In-memory storage for OAuth state tokens
-# State tokens prevent Cross-Site Request Forgery (CSRF) attacks
-# Each token is used once and then deleted
-# Note: In a production multi-server environment, this should be stored in Redis or database
-oauth_states = {}
+# The callback URL registered in Google Console, resolved once at startup.
+# Priority: GOOGLE_REDIRECT_URI env var > Replit domain. Empty means it has
+# to be built from each request's Host header (see get_redirect_uri).
+GOOGLE_CALLBACK_PATH = "/api/auth/google/callback"
+_replit_domain = os.environ.get("REPLIT_DEV_DOMAIN", "")
+GOOGLE_REDIRECT_URI = os.environ.get("GOOGLE_REDIRECT_URI", "") or (
+    f"https://{_replit_domain}{GOOGLE_CALLBACK_PATH}" if _replit_domain else ""
+)
+
+# Behind a TLS-terminating proxy the app itself sees plain http; FORCE_HTTPS=1
+# makes request-derived redirect URIs use https regardless
+FORCE_HTTPS = os.environ.get("FORCE_HTTPS", "0") == "1"
+
+# Print the redirect URI and auth URL on every /google/login (off by default)
+OAUTH_DEBUG = os.environ.get("OAUTH_DEBUG", "0") == "1"
+
+# Everything in the authorization URL except redirect_uri and state
+GOOGLE_AUTH_URL_PREFIX = "https://accounts.google.com/o/oauth2/v2/auth?" + urlencode({
+    "client_id": GOOGLE_CLIENT_ID,
+    "response_type": "code",  # We want an authorization code
+    "scope": "openid email profile",  # Request access to basic profile info
+    "access_type": "offline",  # Get a refresh token (for future use)
+    "prompt": "select_account"  # Always show account picker
+})
+
+# Page returned by the OAuth callback. It stores the user data in
+# localStorage and redirects to the app. This approach is needed because:
+# 1. We can't set localStorage from a redirect
+# 2. The OAuth callback happens in a new tab (due to Google's iframe restrictions)
+# 3. We need to store the user data before redirecting to the app
+# {user_json} is filled with json_for_script(user_data). It sits in a
+# non-executed application/json block and is read back as plain text, so no
+# JavaScript string escaping is needed.
+GOOGLE_CALLBACK_HTML = """
+    <!DOCTYPE html>
+    <html>
+    <head><title>Signing in...</title></head>
+    <body>
+    <script id="auth-user" type="application/json">{user_json}</script>
+    <script>
+        localStorage.setItem('auth_user', document.getElementById('auth-user').textContent);
+        window.location.href = '/';
+    </script>
+    </body>
+    </html>
+    """
+
+# Shared HTTP client for Google's token and userinfo endpoints.
+# Created on first use and closed by close_google_client() on shutdown, so
+# each login reuses an open (HTTP/2) connection instead of a new TLS handshake.
+GOOGLE_HTTP_TIMEOUT = 10.0
+_google_client: Optional[httpx.AsyncClient] = None
+
+# OAuth state tokens prevent Cross-Site Request Forgery (CSRF) attacks.
+# They are stateless: a random nonce plus the issue time, signed with an
+# HMAC key derived from STATE_SECRET (see make_oauth_state). Nothing is
+# stored server-side, so the callback can land on any worker, and tokens
+# older than OAUTH_STATE_TTL seconds are rejected.
+#
+# Without STATE_SECRET a random key is generated per process. That is
+# still unforgeable, but a callback handled by a different worker (or
+# after a restart) than the login fails with invalid_state, so it only
+# works with a single worker.
+OAUTH_STATE_TTL = 600
+STATE_SECRET = os.environ.get("STATE_SECRET", "")
+if STATE_SECRET:
+    _OAUTH_STATE_KEY = hmac.new(
+        STATE_SECRET.encode("utf-8"), b"google-oauth-state", hashlib.sha256
+    ).digest()
+else:
+    _OAUTH_STATE_KEY = secrets.token_bytes(32)
+    if GOOGLE_CLIENT_ID:
+        print("[Auth] STATE_SECRET is not set; using a per-process OAuth state key "
+              "(Google login only works with a single worker)")
+_OAUTH_STATE_NONCE_BYTES = 16
+_OAUTH_STATE_MAC_BYTES = 16
+
+# bcrypt cost factor for user passwords. Each +1 doubles the time per hash
+# (12 is roughly 0.2-0.3 s). Existing hashes are re-hashed with the new cost
+# the next time their owner logs in.
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+
+# Recently verified email logins, so a user logging in again within
+# AUTH_CACHE_TTL seconds skips the bcrypt check. Keys are SHA-256 of a
+# per-process random pepper + email + password, so the cache never holds a
+# usable password and is worthless after a restart. Only successful logins
+# are cached, and an entry only counts while the user's stored hash is
+# unchanged (a password change invalidates it).
+AUTH_CACHE_TTL = 60
+AUTH_CACHE_MAX_ENTRIES = 1024
+_auth_cache_pepper = secrets.token_bytes(32)
+_auth_cache: "OrderedDict[bytes, tuple]" = OrderedDict()  # key -> (password_hash, expires_at)
+_auth_cache_lock = threading.Lock()
+
+# Minimum time between last_login_at updates for the same user
+LAST_LOGIN_WRITE_INTERVAL = timedelta(seconds=60)
+
+# Checked against when the email is unknown, so a login for a missing account
+# takes as long as one with a wrong password (no account enumeration by timing)
+_DUMMY_BCRYPT_HASH = bcrypt.hashpw(secrets.token_bytes(16), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+
+# ============================================================================
+# DEFAULT ADMIN ACCOUNT
+# ============================================================================
+# Fallback login (admin/admin123) for initial setup; see verify_default_admin.
+# Only SHA-256 digests of the credentials are compared at runtime.
+_DEFAULT_ADMIN_USERNAME_DIGEST = hashlib.sha256(b"admin").digest()
+_DEFAULT_ADMIN_PASSWORD_DIGEST = hashlib.sha256(b"admin123").digest()
+
+DEFAULT_ADMIN_USER = MappingProxyType({
+    "id": 1,
+    "name": "Administrator",
+    "username": "admin",
+    "email": "admin@infinitywork.co.za",
+    "role": "admin"
+})
+
+# 401 messages; deliberately don't say which part of the credentials was wrong
+INVALID_USERNAME_OR_PASSWORD = "Invalid username or password"
+INVALID_EMAIL_OR_PASSWORD = "Invalid email or password"
 
 
 # ============================================================================
@@ -127,27 +258,125 @@ class UserResponse(BaseModel):
     profile_image_url: Optional[str] = None
 
 
+class AuthResponse(BaseModel):
+    """
+    Response body of the login/register endpoints: {"user": {...}}.
+    
+    Declared as the routes' response_model so the shape is documented in
+    the OpenAPI schema and checked in one place.
+    """
+    user: UserResponse
+
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
-def hash_password(password: str) -> str:
+def constant_time_equals(a: str, b: str) -> bool:
+    """
+    Compare two strings in constant time.
+    
+    A plain == stops at the first differing character, so response times
+    reveal how much of a secret an attacker has guessed correctly.
+    """
+    return hmac.compare_digest(a.encode('utf-8'), b.encode('utf-8'))
+
+
+def hash_user_password(password: str) -> str:
+    """Hash a user's password with bcrypt at the configured BCRYPT_ROUNDS."""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+
+def verify_user_password(password: str, password_hash: str) -> bool:
+    """Check a password against a stored bcrypt hash."""
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def password_needs_rehash(password_hash: str) -> bool:
     """
-    Hash a password using SHA-256.
+    Return True if a bcrypt hash was made with a different cost than BCRYPT_ROUNDS.
     
-    This is a one-way hash - you cannot recover the original password.
-    When a user logs in, we hash their input and compare it to the stored hash.
+    The cost is stored in the hash itself ("$2b$12$..."), so no extra
+    hashing is needed to check it.
+    """
+    try:
+        return int(password_hash.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+def _auth_cache_key(email: str, password: str) -> bytes:
+    return hashlib.sha256(
+        _auth_cache_pepper + email.encode('utf-8') + b"\0" + password.encode('utf-8')
+    ).digest()
+
+
+def verify_cached_login(email: str, password: str, password_hash: str) -> bool:
+    """Return True if this email/password was verified against password_hash recently."""
+    key = _auth_cache_key(email, password)
+    with _auth_cache_lock:
+        entry = _auth_cache.get(key)
+        if entry is None:
+            return False
+        cached_hash, expires_at = entry
+        if expires_at < time.monotonic():
+            del _auth_cache[key]
+            return False
+        _auth_cache.move_to_end(key)
+    return constant_time_equals(cached_hash, password_hash)
+
+
+def remember_login(email: str, password: str, password_hash: str):
+    """Cache a successful bcrypt verification for AUTH_CACHE_TTL seconds."""
+    key = _auth_cache_key(email, password)
+    with _auth_cache_lock:
+        _auth_cache[key] = (password_hash, time.monotonic() + AUTH_CACHE_TTL)
+        _auth_cache.move_to_end(key)
+        while len(_auth_cache) > AUTH_CACHE_MAX_ENTRIES:
+            _auth_cache.popitem(last=False)
+
+
+def verify_admin_password(password: str, stored_hash: str) -> tuple:
+    """
+    Check a login attempt against the admin_password setting.
     
-    Security Note: SHA-256 is used for simplicity. For production systems,
-    consider using bcrypt or argon2 which include salt and are designed for passwords.
+    New values are bcrypt hashes. Older installs stored an unsalted SHA-256
+    hex digest; those are still accepted so nobody gets locked out, and the
+    caller is told to replace them with a bcrypt hash.
     
     Args:
-        password: The plain text password to hash
+        password: The plain text password from the login form
+        stored_hash: The admin_password value from the Settings table
         
     Returns:
-        The SHA-256 hash of the password as a hexadecimal string
+        (matches, needs_upgrade) - needs_upgrade is True when a legacy
+        SHA-256 value matched and should be re-saved as bcrypt
     """
-    return hashlib.sha256(password.encode()).hexdigest()
+    if stored_hash.startswith("$2"):
+        return verify_user_password(password, stored_hash), False
+    legacy = hashlib.sha256(password.encode()).hexdigest()
+    matches = constant_time_equals(legacy, stored_hash)
+    return matches, matches
+
+
+def get_google_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient used to talk to Google, creating it if needed."""
+    global _google_client
+    if _google_client is None or _google_client.is_closed:
+        _google_client = httpx.AsyncClient(
+            http2=True,
+            timeout=GOOGLE_HTTP_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+    return _google_client
+
+
+async def close_google_client():
+    """Close the shared Google client (called from the app's lifespan on shutdown)."""
+    global _google_client
+    if _google_client is not None:
+        await _google_client.aclose()
+        _google_client = None
 
 
 def verify_default_admin(username: str, password: str) -> Optional[dict]:
@@ -170,14 +399,13 @@ def verify_default_admin(username: str, password: str) -> Optional[dict]:
     Returns:
         User data dictionary if credentials match, None otherwise
     """
-    if username == "admin" and password == "admin123":
-        return {
-            "id": 1,
-            "name": "Administrator",
-            "username": "admin",
-            "email": "admin@infinitywork.co.za",
-            "role": "admin"
-        }
+    # Compare fixed-length digests so neither the content nor the length of
+    # the input leaks through timing. Both checks always run (& not "and")
+    # so timing doesn't reveal which one failed.
+    username_ok = hmac.compare_digest(hashlib.sha256(username.encode('utf-8')).digest(), _DEFAULT_ADMIN_USERNAME_DIGEST)
+    password_ok = hmac.compare_digest(hashlib.sha256(password.encode('utf-8')).digest(), _DEFAULT_ADMIN_PASSWORD_DIGEST)
+    if username_ok & password_ok:
+        return dict(DEFAULT_ADMIN_USER)
     return None
 
 
@@ -185,7 +413,7 @@ def verify_default_admin(username: str, password: str) -> Optional[dict]:
 # TRADITIONAL LOGIN ENDPOINTS
 # ============================================================================
 
-@router.post("/login")
+@router.post("/login", response_model=AuthResponse)
 def login(request: LoginRequest, db: Session = Depends(get_db)):
     """
     Traditional username/password login endpoint.
@@ -212,19 +440,26 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
     - If default admin doesn't work: Someone may have changed the admin credentials
     """
     # First, check if custom admin credentials have been set in Settings
-    admin_username = db.query(Settings).filter(Settings.key == "admin_username").first()
-    admin_password = db.query(Settings).filter(Settings.key == "admin_password").first()
+    # (read from the cached settings, so failed attempts don't hit the database)
+    settings = get_all_settings(db)
+    admin_username = settings.get("admin_username")
+    admin_password = settings.get("admin_password")
     
     # If custom credentials exist, verify against them
     if admin_username and admin_password:
-        if request.username == admin_username.value:
+        if constant_time_equals(request.username, admin_username):
             # Compare hashed passwords (stored password is already hashed)
-            if hash_password(request.password) == admin_password.value:
+            matches, needs_upgrade = verify_admin_password(request.password, admin_password)
+            if matches:
+                if needs_upgrade:
+                    # One-time migration of the legacy SHA-256 value to bcrypt
+                    save_settings(db, {"admin_password": hash_user_password(request.password)})
+                    print("[Auth] Upgraded stored admin password hash to bcrypt")
                 return {
                     "user": {
                         "id": 1,
-                        "name": admin_username.value,
-                        "username": admin_username.value,
+                        "name": admin_username,
+                        "username": admin_username,
                         "email": "admin@infinitywork.co.za",
                         "role": "admin"
                     }
@@ -236,7 +471,7 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
         return {"user": user}
     
     # No valid credentials found
-    raise HTTPException(status_code=401, detail="Invalid username or password")
+    raise HTTPException(status_code=401, detail=INVALID_USERNAME_OR_PASSWORD)
 
 
 @router.post("/logout")
@@ -256,7 +491,7 @@ def logout():
     return {"status": "logged_out"}
 
 
-@router.post("/register")
+@router.post("/register", response_model=AuthResponse)
 def register(request: RegisterRequest, db: Session = Depends(get_db)):
     """
     Register a new user with email/password.
@@ -281,7 +516,7 @@ def register(request: RegisterRequest, db: Session = Depends(get_db)):
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed = bcrypt.hashpw(request.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    hashed = hash_user_password(request.password)
     
     user = User(
         email=request.email,
@@ -296,24 +531,26 @@ def register(request: RegisterRequest, db: Session = Depends(get_db)):
         last_login_at=datetime.utcnow()
     )
     db.add(user)
+    # Flush to get the new id, and build the response before committing:
+    # every other field is already in memory, while the commit expires the
+    # object and reading it afterwards would cost another SELECT
+    db.flush()
+    user_data = {
+        "id": user.id,
+        "name": user.display_name,
+        "email": user.email,
+        "username": user.email,
+        "role": user.role,
+        "position": user.position,
+        "organization": user.organization,
+        "profile_image_url": None  # only set for Google accounts
+    }
     db.commit()
-    db.refresh(user)
     
-    return {
-        "user": {
-            "id": user.id,
-            "name": f"{user.first_name} {user.last_name}".strip(),
-            "email": user.email,
-            "username": user.email,
-            "role": user.role,
-            "position": user.position,
-            "organization": user.organization,
-            "profile_image_url": user.profile_image_url
-        }
-    }
+    return {"user": user_data}
 
 
-@router.post("/email-login")
+@router.post("/email-login", response_model=AuthResponse)
 def email_login(request: EmailLoginRequest, db: Session = Depends(get_db)):
     """
     Login with email and password.
@@ -333,33 +570,61 @@ def email_login(request: EmailLoginRequest, db: Session = Depends(get_db)):
     """
     user = db.query(User).filter(User.email == request.email).first()
     
-    if not user or not user.password_hash:
-        raise HTTPException(status_code=401, detail="Invalid email or password")
+    # Always run one bcrypt check, even for unknown emails or Google-only
+    # accounts, so every failure takes the same time. Only a repeat of a
+    # recent successful login can skip it.
+    has_password = bool(user and user.password_hash)
+    stored_hash = user.password_hash if has_password else _DUMMY_BCRYPT_HASH
+    if has_password and verify_cached_login(request.email, request.password, stored_hash):
+        password_ok = True
+    else:
+        password_ok = verify_user_password(request.password, stored_hash)
+        if has_password and password_ok:
+            remember_login(request.email, request.password, stored_hash)
     
-    if not bcrypt.checkpw(request.password.encode('utf-8'), user.password_hash.encode('utf-8')):
-        raise HTTPException(status_code=401, detail="Invalid email or password")
+    if not (has_password and password_ok):
+        raise HTTPException(status_code=401, detail=INVALID_EMAIL_OR_PASSWORD)
     
     if not user.is_active:
         raise HTTPException(status_code=403, detail="Account is inactive")
     
-    user.last_login_at = datetime.utcnow()
-    db.commit()
+    # Upgrade hashes made with an old BCRYPT_ROUNDS while we have the password
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = hash_user_password(request.password)
     
-    return {
-        "user": {
-            "id": user.id,
-            "name": f"{user.first_name or ''} {user.last_name or ''}".strip() or user.email,
-            "email": user.email,
-            "username": user.email,
-            "role": user.role,
-            "position": user.position,
-            "organization": user.organization,
-            "profile_image_url": user.profile_image_url
-        }
+    # last_login_at is only for activity tracking, so repeated logins within
+    # LAST_LOGIN_WRITE_INTERVAL don't each pay for an UPDATE + commit
+    now = datetime.utcnow()
+    if not user.last_login_at or now - user.last_login_at >= LAST_LOGIN_WRITE_INTERVAL:
+        user.last_login_at = now
+    
+    # Built before committing, which would expire the loaded attributes
+    user_data = {
+        "id": user.id,
+        "name": user.display_name,
+        "email": user.email,
+        "username": user.email,
+        "role": user.role,
+        "position": user.position,
+        "organization": user.organization,
+        "profile_image_url": user.profile_image_url
     }
+    
+    if db.dirty:
+        db.commit()
+    
+    return {"user": user_data}
+
 
+# /me always returns the same user, so its JSON body is encoded once.
+# A fresh Response is still made per request (FastAPI attaches per-request
+# state such as background tasks to the returned object).
+_CURRENT_USER_JSON = orjson.dumps(
+    AuthResponse(user=UserResponse(**DEFAULT_ADMIN_USER)).model_dump()
+)
 
-@router.get("/me")
+
+@router.get("/me", response_model=AuthResponse)
 def get_current_user():
     """
     Get the currently logged-in user's information.
@@ -376,21 +641,161 @@ def get_current_user():
     Returns:
         JSON with current user data
     """
-    return {
-        "user": {
-            "id": 1,
-            "name": "Administrator",
-            "username": "admin",
-            "email": "admin@infinitywork.co.za",
-            "role": "admin"
-        }
-    }
+    return Response(content=_CURRENT_USER_JSON, media_type="application/json")
 
 
 # ============================================================================
 # GOOGLE OAUTH 2.0 ENDPOINTS
 # ============================================================================
 
+def json_for_script(data) -> str:
+    """
+    Encode data as JSON, safe to embed in a <script type="application/json"> block.
+    
+    "<" can only appear inside JSON strings, where \\u003c decodes to the
+    same character, so escaping it keeps a value such as "</script>" in a
+    Google display name from closing the tag without changing the data.
+    """
+    return orjson.dumps(data).decode("utf-8").replace("<", "\\u003c")
+
+
+def _oauth_state_mac(payload: bytes) -> bytes:
+    return hmac.new(_OAUTH_STATE_KEY, payload, hashlib.sha256).digest()[:_OAUTH_STATE_MAC_BYTES]
+
+
+def make_oauth_state() -> str:
+    """Return a signed, URL-safe state token: base64url(nonce || issued_at || mac)."""
+    payload = secrets.token_bytes(_OAUTH_STATE_NONCE_BYTES) + int(time.time()).to_bytes(8, "big")
+    return base64.urlsafe_b64encode(payload + _oauth_state_mac(payload)).decode("ascii")
+
+
+def verify_oauth_state(state: str) -> bool:
+    """
+    Check a state token made by make_oauth_state.
+    
+    Valid if the signature matches and it was issued within OAUTH_STATE_TTL
+    seconds. Malformed tokens are simply invalid.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(state.encode("ascii"))
+    except (ValueError, UnicodeEncodeError):
+        return False
+    if len(raw) != _OAUTH_STATE_NONCE_BYTES + 8 + _OAUTH_STATE_MAC_BYTES:
+        return False
+    payload, mac = raw[:-_OAUTH_STATE_MAC_BYTES], raw[-_OAUTH_STATE_MAC_BYTES:]
+    if not hmac.compare_digest(mac, _oauth_state_mac(payload)):
+        return False
+    issued_at = int.from_bytes(payload[-8:], "big")
+    return 0 <= time.time() - issued_at <= OAUTH_STATE_TTL
+
+
+def get_redirect_uri(request: Request) -> str:
+    """
+    Return the OAuth callback URL for this request.
+    
+    Uses the URI resolved at startup when there is one; otherwise builds it
+    from the request's Host header.
+    """
+    if GOOGLE_REDIRECT_URI:
+        return GOOGLE_REDIRECT_URI
+    host = request.headers.get("host", "")
+    scheme = "https" if FORCE_HTTPS or "replit" in host else request.url.scheme
+    return f"{scheme}://{host}{GOOGLE_CALLBACK_PATH}"
+
+
+# Columns the frontend needs after a Google login
+_GOOGLE_USER_COLUMNS = (
+    User.id, User.email, User.display_name.label("name"), User.role,
+    User.position, User.organization, User.profile_image_url
+)
+
+
+def sync_google_user(
+    db: Session,
+    google_id: str,
+    email: str,
+    first_name: str,
+    last_name: str,
+    profile_image: str
+) -> dict:
+    """
+    Find or create the user for a Google login and refresh their profile.
+    
+    Returning Google users and brand-new users are handled by one
+    INSERT ... ON CONFLICT (google_id) DO UPDATE ... RETURNING statement.
+    Only when the email already belongs to an account that isn't linked to
+    Google yet (e.g. registered with a password) does the insert fail on
+    the email constraint; that account is then linked with an UPDATE.
+    
+    A returning user whose name and picture are unchanged, and who logged
+    in less than LAST_LOGIN_WRITE_INTERVAL ago, isn't rewritten at all: the
+    DO UPDATE is skipped and the row is just read back.
+    
+    Blocking (synchronous session), so google_callback runs it via
+    run_in_threadpool.
+    
+    Returns:
+        User data dictionary for the frontend
+    """
+    now = datetime.utcnow()
+    # Profile fields refreshed from Google on every login
+    profile = {
+        "first_name": first_name,
+        "last_name": last_name,
+        "profile_image_url": profile_image,
+        "last_login_at": now,
+    }
+    
+    stmt = pg_insert(User).values(
+        email=email,
+        google_id=google_id,
+        role="user",  # New users get 'user' role by default
+        **profile
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.google_id],
+        set_={**profile, "updated_at": utc_now()},
+        # Only write when the profile changed or last_login_at is stale
+        where=or_(
+            User.first_name.is_distinct_from(stmt.excluded.first_name),
+            User.last_name.is_distinct_from(stmt.excluded.last_name),
+            User.profile_image_url.is_distinct_from(stmt.excluded.profile_image_url),
+            User.last_login_at.is_(None),
+            User.last_login_at < now - LAST_LOGIN_WRITE_INTERVAL,
+        )
+    ).returning(*_GOOGLE_USER_COLUMNS)
+    
+    try:
+        with db.begin_nested():
+            row = db.execute(stmt).one_or_none()
+    except IntegrityError:
+        # Existing account with this email - link it to Google
+        row = db.execute(
+            update(User)
+            .where(User.email == email)
+            .values(google_id=google_id, **profile)
+            .returning(*_GOOGLE_USER_COLUMNS)
+        ).one()
+    if row is None:
+        # Conflict but nothing to update - RETURNING gives no row then
+        row = db.execute(
+            select(*_GOOGLE_USER_COLUMNS).where(User.google_id == google_id)
+        ).one()
+    db.commit()
+    
+    # Prepare user data to send to the frontend
+    return {
+        "id": row.id,
+        "name": row.name,
+        "email": row.email,
+        "username": row.email,  # Email serves as username for OAuth users
+        "role": row.role,
+        "position": row.position,
+        "organization": row.organization,
+        "profile_image_url": row.profile_image_url
+    }
+
+
 @router.get("/google/login")
 async def google_login(request: Request):
     """
@@ -408,7 +813,7 @@ async def google_login(request: Request):
     6. The callback endpoint exchanges the code for user info
     
     Security Features:
-    - State token: A random string that prevents CSRF attacks
+    - State token: A signed, expiring token that prevents CSRF attacks
     - HTTPS redirect URI: Required by Google for security
     
     Args:
@@ -429,45 +834,21 @@ async def google_login(request: Request):
     if not GOOGLE_CLIENT_ID:
         raise HTTPException(status_code=500, detail="Google OAuth not configured. Please add GOOGLE_CLIENT_ID.")
     
-    # Generate a random state token for CSRF protection
+    # Generate a signed state token for CSRF protection
     # This token must be returned by Google in the callback
-    state = secrets.token_urlsafe(32)
-    oauth_states[state] = datetime.utcnow()
+    state = make_oauth_state()
     
     # Determine the redirect URI
-    # Priority: Custom env var > Replit domain > Request host
-    custom_redirect = os.environ.get("GOOGLE_REDIRECT_URI", "")
-    if custom_redirect:
-        # Use explicitly configured redirect URI
-        redirect_uri = custom_redirect
-    else:
-        # On Replit, use the REPLIT_DEV_DOMAIN environment variable
-        replit_domain = os.environ.get("REPLIT_DEV_DOMAIN", "")
-        if replit_domain:
-            redirect_uri = f"https://{replit_domain}/api/auth/google/callback"
-        else:
-            # Fallback: construct URI from request headers
-            host = request.headers.get("host", "")
-            scheme = "https" if "replit" in host else request.url.scheme
-            redirect_uri = f"{scheme}://{host}/api/auth/google/callback"
-    
-    # Build the Google OAuth authorization URL
-    params = {
-        "client_id": GOOGLE_CLIENT_ID,
-        "redirect_uri": redirect_uri,
-        "response_type": "code",  # We want an authorization code
-        "scope": "openid email profile",  # Request access to basic profile info
-        "state": state,  # CSRF protection token
-        "access_type": "offline",  # Get a refresh token (for future use)
-        "prompt": "select_account"  # Always show account picker
-    }
+    redirect_uri = get_redirect_uri(request)
     
-    google_auth_url = f"https://accounts.google.com/o/oauth2/v2/auth?{urlencode(params)}"
+    # Build the Google OAuth authorization URL (static part is precomputed)
+    google_auth_url = f"{GOOGLE_AUTH_URL_PREFIX}&{urlencode({'redirect_uri': redirect_uri, 'state': state})}"
     
-    # Debug logging (helpful for troubleshooting OAuth issues)
-    print(f"[DEBUG] Google OAuth redirect_uri: {redirect_uri}")
-    print(f"[DEBUG] Google OAuth client_id: {GOOGLE_CLIENT_ID[:20]}...")
-    print(f"[DEBUG] Full auth URL (without state): {google_auth_url.split('&state=')[0]}")
+    # Debug logging (helpful for troubleshooting OAuth issues; set OAUTH_DEBUG=1)
+    if OAUTH_DEBUG:
+        print(f"[DEBUG] Google OAuth redirect_uri: {redirect_uri}")
+        print(f"[DEBUG] Google OAuth client_id: {GOOGLE_CLIENT_ID[:20]}...")
+        print(f"[DEBUG] Full auth URL (without state): {google_auth_url.split('&state=')[0]}")
     
     return RedirectResponse(url=google_auth_url)
 
@@ -520,56 +901,45 @@ async def google_callback(
         return RedirectResponse(url="/?error=missing_params")
     
     # Validate the state token (CSRF protection)
-    # The state must match one we generated in google_login
-    if state not in oauth_states:
+    # The state must carry our signature and be less than OAUTH_STATE_TTL old
+    if not verify_oauth_state(state):
         return RedirectResponse(url="/?error=invalid_state")
     
-    # Remove the used state token (one-time use only)
-    del oauth_states[state]
-    
     # Reconstruct the redirect URI (must match exactly what we sent to Google)
-    custom_redirect = os.environ.get("GOOGLE_REDIRECT_URI", "")
-    if custom_redirect:
-        redirect_uri = custom_redirect
-    else:
-        replit_domain = os.environ.get("REPLIT_DEV_DOMAIN", "")
-        if replit_domain:
-            redirect_uri = f"https://{replit_domain}/api/auth/google/callback"
-        else:
-            host = request.headers.get("host", "")
-            scheme = "https" if "replit" in host else request.url.scheme
-            redirect_uri = f"{scheme}://{host}/api/auth/google/callback"
+    redirect_uri = get_redirect_uri(request)
     
     # Exchange the authorization code for tokens
-    async with httpx.AsyncClient() as client:
-        # Step 1: Exchange authorization code for access token
-        token_response = await client.post(
-            "https://oauth2.googleapis.com/token",
-            data={
-                "client_id": GOOGLE_CLIENT_ID,
-                "client_secret": GOOGLE_CLIENT_SECRET,
-                "code": code,
-                "grant_type": "authorization_code",
-                "redirect_uri": redirect_uri,
-            }
-        )
-        
-        if token_response.status_code != 200:
-            return RedirectResponse(url="/?error=token_exchange_failed")
-        
-        tokens = token_response.json()
-        access_token = tokens.get("access_token")
-        
-        # Step 2: Use the access token to fetch user information
-        userinfo_response = await client.get(
-            "https://www.googleapis.com/oauth2/v2/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
-        
-        if userinfo_response.status_code != 200:
-            return RedirectResponse(url="/?error=userinfo_failed")
-        
-        userinfo = userinfo_response.json()
+    # (shared client, so the TLS connection to Google is reused between logins)
+    client = get_google_client()
+    
+    # Step 1: Exchange authorization code for access token
+    token_response = await client.post(
+        "https://oauth2.googleapis.com/token",
+        data={
+            "client_id": GOOGLE_CLIENT_ID,
+            "client_secret": GOOGLE_CLIENT_SECRET,
+            "code": code,
+            "grant_type": "authorization_code",
+            "redirect_uri": redirect_uri,
+        }
+    )
+    
+    if token_response.status_code != 200:
+        return RedirectResponse(url="/?error=token_exchange_failed")
+    
+    tokens = token_response.json()
+    access_token = tokens.get("access_token")
+    
+    # Step 2: Use the access token to fetch user information
+    userinfo_response = await client.get(
+        "https://www.googleapis.com/oauth2/v2/userinfo",
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    
+    if userinfo_response.status_code != 200:
+        return RedirectResponse(url="/?error=userinfo_failed")
+    
+    userinfo = userinfo_response.json()
     
     # Extract user information from Google's response
     google_id = userinfo.get("id")  # Unique Google user ID
@@ -583,75 +953,23 @@ async def google_callback(
     if profile_image and len(profile_image) > 500:
         profile_image = profile_image[:500]
     
-    # Find or create the user in our database
-    # First, try to find by Google ID (for returning users)
-    user = db.query(User).filter(User.google_id == google_id).first()
-    
-    if not user:
-        # User not found by Google ID - check if they exist by email
-        # (They might have been created via another method)
-        user = db.query(User).filter(User.email == email).first()
-        if user:
-            # Link their existing account to Google
-            user.google_id = google_id
-        else:
-            # Create a new user account
-            user = User(
-                email=email,
-                google_id=google_id,
-                first_name=first_name,
-                last_name=last_name,
-                profile_image_url=profile_image,
-                role="user"  # New users get 'user' role by default
-            )
-            db.add(user)
-    
-    # Update user's profile with latest info from Google
-    user.last_login_at = datetime.utcnow()
-    user.first_name = first_name
-    user.last_name = last_name
-    user.profile_image_url = profile_image
-    db.commit()
-    db.refresh(user)
-    
-    # Prepare user data to send to the frontend
-    user_data = {
-        "id": user.id,
-        "name": f"{user.first_name or ''} {user.last_name or ''}".strip() or user.email,
-        "email": user.email,
-        "username": user.email,  # Email serves as username for OAuth users
-        "role": user.role,
-        "position": user.position,
-        "organization": user.organization,
-        "profile_image_url": user.profile_image_url
-    }
-    
-    # Convert user data to JSON and escape it for embedding in JavaScript
-    import json
-    user_json = json.dumps(user_data)
-    # Escape special characters to prevent JavaScript injection
-    escaped_json = user_json.replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n').replace('\r', '\\r')
+    # Find or create the user in our database. The session is synchronous,
+    # so run it in the threadpool instead of blocking the event loop.
+    user_data = await run_in_threadpool(
+        sync_google_user, db, google_id, email, first_name, last_name, profile_image
+    )
     
     # Return an HTML page that stores user data in localStorage and redirects
-    # This approach is needed because:
-    # 1. We can't set localStorage from a redirect
-    # 2. The OAuth callback happens in a new tab (due to Google's iframe restrictions)
-    # 3. We need to store the user data before redirecting to the app
-    html_response = f"""
-    <!DOCTYPE html>
-    <html>
-    <head><title>Signing in...</title></head>
-    <body>
-    <script>
-        localStorage.setItem('auth_user', '{escaped_json}');
-        window.location.href = '/';
-    </script>
-    </body>
-    </html>
-    """
-    
-    from fastapi.responses import HTMLResponse
-    return HTMLResponse(content=html_response)
+    return HTMLResponse(content=GOOGLE_CALLBACK_HTML.format(user_json=json_for_script(user_data)))
+
+
+# The Google credentials come from the environment and can't change while
+# the app runs, so the status body is encoded once at import
+_GOOGLE_STATUS_JSON = orjson.dumps({
+    "configured": bool(GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET),
+    "client_id_set": bool(GOOGLE_CLIENT_ID),
+    "client_secret_set": bool(GOOGLE_CLIENT_SECRET)
+})
 
 
 @router.get("/google/status")
@@ -672,9 +990,4 @@ async def google_oauth_status():
     - If "configured" is false, check that both environment variables are set
     - Get credentials from Google Cloud Console > APIs & Services > Credentials
     """
-    configured = bool(GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET)
-    return {
-        "configured": configured,
-        "client_id_set": bool(GOOGLE_CLIENT_ID),
-        "client_secret_set": bool(GOOGLE_CLIENT_SECRET)
-    }
+    return Response(content=_GOOGLE_STATUS_JSON, media_type="application/json")
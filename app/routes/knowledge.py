@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import func, insert, literal_column, select, tuple_, update
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 from app.database import get_db
-from app.models import KnowledgeArticle
+from app.models import KnowledgeArticle, knowledge_search_text, knowledge_search_vector
 
 router = APIRouter(prefix="/api/knowledge", tags=["knowledge"])
 
@@ -37,94 +38,172 @@ class ArticleResponse(BaseModel):
         from_attributes = True
 
 
+# Columns of ArticleResponse. The endpoints select (or RETURN) exactly
+# these and return them through ORJSONResponse, skipping ORM objects and
+# FastAPI's response_model re-validation (response_model is kept for the
+# API docs).
+_ARTICLE_COLUMNS = (
+    KnowledgeArticle.id,
+    KnowledgeArticle.title,
+    KnowledgeArticle.category,
+    KnowledgeArticle.keywords,
+    KnowledgeArticle.content,
+    KnowledgeArticle.created_at,
+    KnowledgeArticle.updated_at,
+)
+
+
+def _article_rows(db: Session, stmt) -> List[dict]:
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+
+# Response header carrying the cursor for the next page of get_articles
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 200
+
+
+def _encode_cursor(updated_at: datetime, article_id: int) -> str:
+    return f"{updated_at.isoformat()}|{article_id}"
+
+
+def _decode_cursor(cursor: str):
+    updated_at, _, article_id = cursor.rpartition("|")
+    try:
+        return datetime.fromisoformat(updated_at), int(article_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/", response_model=List[ArticleResponse])
 def get_articles(
     category: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db)
 ):
-    query = db.query(KnowledgeArticle)
+    """
+    List articles, most recently updated first.
+    
+    Without limit every matching article is returned (what the dashboard
+    does). With limit, at most that many are returned and, if there are
+    more, the X-Next-Cursor header holds the cursor to pass for the next
+    page. Pages are keyset-paginated on (updated_at, id), so a page costs
+    the same however deep it is.
+    """
+    stmt = select(*_ARTICLE_COLUMNS)
     
     if category:
-        query = query.filter(KnowledgeArticle.category == category)
+        stmt = stmt.where(KnowledgeArticle.category == category)
     
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                KnowledgeArticle.title.ilike(search_term),
-                KnowledgeArticle.keywords.ilike(search_term),
-                KnowledgeArticle.content.ilike(search_term)
-            )
+        # One ILIKE over title + keywords + content, served by the trigram index
+        stmt = stmt.where(knowledge_search_text.ilike(f"%{search}%"))
+    
+    if cursor:
+        stmt = stmt.where(
+            tuple_(KnowledgeArticle.updated_at, KnowledgeArticle.id) < _decode_cursor(cursor)
         )
     
-    return query.order_by(KnowledgeArticle.updated_at.desc()).all()
+    stmt = stmt.order_by(KnowledgeArticle.updated_at.desc(), KnowledgeArticle.id.desc())
+    if limit is None:
+        return ORJSONResponse(_article_rows(db, stmt))
+    
+    # Fetch one extra row to learn whether there is a next page
+    rows = _article_rows(db, stmt.limit(limit + 1))
+    response = ORJSONResponse(rows[:limit])
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(last["updated_at"], last["id"])
+    return response
 
 
-@router.get("/suggestions")
+@router.get("/suggestions", response_model=List[ArticleResponse])
 def get_suggestions(
     category: Optional[str] = Query(None),
     keywords: Optional[str] = Query(None),
     db: Session = Depends(get_db)
 ):
-    query = db.query(KnowledgeArticle)
+    stmt = select(*_ARTICLE_COLUMNS)
     
     if category:
-        query = query.filter(KnowledgeArticle.category == category)
+        stmt = stmt.where(KnowledgeArticle.category == category)
     
+    order_by = [KnowledgeArticle.updated_at.desc()]
     if keywords:
         keyword_list = [k.strip().lower() for k in keywords.split(",") if k.strip()]
         if keyword_list:
-            conditions = []
-            for kw in keyword_list:
-                conditions.append(KnowledgeArticle.keywords.ilike(f"%{kw}%"))
-                conditions.append(KnowledgeArticle.title.ilike(f"%{kw}%"))
-                conditions.append(KnowledgeArticle.content.ilike(f"%{kw}%"))
-            query = query.filter(or_(*conditions))
+            # Match any keyword via the GIN full-text index, best matches first
+            ts_query = func.plainto_tsquery(literal_column("'english'"), keyword_list[0])
+            for kw in keyword_list[1:]:
+                ts_query = ts_query.op("||")(func.plainto_tsquery(literal_column("'english'"), kw))
+            stmt = stmt.where(knowledge_search_vector.op("@@")(ts_query))
+            order_by.insert(0, func.ts_rank_cd(knowledge_search_vector, ts_query).desc())
     
-    return query.order_by(KnowledgeArticle.updated_at.desc()).limit(5).all()
+    stmt = stmt.order_by(*order_by).limit(5)
+    return ORJSONResponse(_article_rows(db, stmt))
 
 
 @router.get("/{article_id}", response_model=ArticleResponse)
 def get_article(article_id: int, db: Session = Depends(get_db)):
-    article = db.query(KnowledgeArticle).filter(KnowledgeArticle.id == article_id).first()
-    if not article:
+    rows = _article_rows(db, select(*_ARTICLE_COLUMNS).where(KnowledgeArticle.id == article_id))
+    if not rows:
         raise HTTPException(status_code=404, detail="Article not found")
-    return article
+    return ORJSONResponse(rows[0])
 
 
 @router.post("/", response_model=ArticleResponse)
 def create_article(data: ArticleCreate, db: Session = Depends(get_db)):
-    article = KnowledgeArticle(
-        title=data.title,
-        category=data.category,
-        keywords=data.keywords,
-        content=data.content
-    )
-    db.add(article)
+    existing = db.query(KnowledgeArticle).filter(KnowledgeArticle.title == data.title).first()
+    if existing:
+        raise HTTPException(status_code=400, detail="Article title already exists")
+    
+    # RETURNING gives back the database-filled id and timestamps, so there
+    # is no refresh SELECT after the commit
+    row = db.execute(
+        insert(KnowledgeArticle)
+        .values(
+            title=data.title,
+            category=data.category,
+            keywords=data.keywords,
+            content=data.content
+        )
+        .returning(*_ARTICLE_COLUMNS)
+    ).mappings().one()
     db.commit()
-    db.refresh(article)
-    return article
+    return ORJSONResponse(dict(row))
 
 
 @router.put("/{article_id}", response_model=ArticleResponse)
 def update_article(article_id: int, data: ArticleUpdate, db: Session = Depends(get_db)):
-    article = db.query(KnowledgeArticle).filter(KnowledgeArticle.id == article_id).first()
-    if not article:
-        raise HTTPException(status_code=404, detail="Article not found")
+    changes = data.model_dump(exclude_none=True)
+    
+    if "title" in changes:
+        existing = db.query(KnowledgeArticle).filter(
+            KnowledgeArticle.title == data.title,
+            KnowledgeArticle.id != article_id
+        ).first()
+        if existing:
+            raise HTTPException(status_code=400, detail="Article title already exists")
     
-    if data.title is not None:
-        article.title = data.title
-    if data.category is not None:
-        article.category = data.category
-    if data.keywords is not None:
-        article.keywords = data.keywords
-    if data.content is not None:
-        article.content = data.content
+    if changes:
+        # updated_at is set by the column's onupdate; RETURNING replaces the
+        # load + refresh round trips
+        stmt = (
+            update(KnowledgeArticle)
+            .where(KnowledgeArticle.id == article_id)
+            .values(**changes)
+            .returning(*_ARTICLE_COLUMNS)
+        )
+    else:
+        stmt = select(*_ARTICLE_COLUMNS).where(KnowledgeArticle.id == article_id)
+    row = db.execute(stmt).mappings().one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Article not found")
     
+    article = dict(row)
     db.commit()
-    db.refresh(article)
-    return article
+    return ORJSONResponse(article)
 
 
 @router.delete("/{article_id}")
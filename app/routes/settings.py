@@ -1,65 +1,56 @@
 from typing import Dict, Optional
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from app.database import get_db
-from app.models import Settings
+from app.services import settings_service
+from app.services.settings_service import save_settings
 from app.services.scheduler_service import (
     start_scheduler, stop_scheduler, get_scheduler_status, update_scheduler_interval
 )
 
 router = APIRouter(prefix="/api/settings", tags=["settings"])
 
-SETTING_KEYS = [
+# Keys exposed by the general settings page, in the order they are returned
+SETTING_KEYS = (
     "imap_host", "imap_port", "imap_username", "imap_password",
     "smtp_host", "smtp_port", "smtp_username", "smtp_password", "smtp_from_email",
     "openai_api_key", "scheduler_enabled", "scheduler_interval_minutes",
     "slack_webhook_url", "slack_notify_on_new", "slack_notify_on_urgent", "slack_notify_on_process"
-]
+)
+_SETTING_KEY_SET = frozenset(SETTING_KEYS)
+
+# Secrets are never sent back to the browser; the page shows MASKED_VALUE
+# and sends it back unchanged, which update_settings ignores
+MASKED_VALUE = "********"
+MASKED_KEYS = frozenset({"imap_password", "smtp_password", "openai_api_key", "slack_webhook_url"})
 
 
 class SettingsUpdate(BaseModel):
     settings: Dict[str, str]
 
 
-def get_setting(db: Session, key: str) -> Optional[str]:
-    setting = db.query(Settings).filter(Settings.key == key).first()
-    return setting.value if setting else None
-
-
-def set_setting(db: Session, key: str, value: str):
-    setting = db.query(Settings).filter(Settings.key == key).first()
-    if setting:
-        setting.value = value
-    else:
-        setting = Settings(key=key, value=value)
-        db.add(setting)
-    db.commit()
-
-
 @router.get("/")
 def get_settings(db: Session = Depends(get_db)):
-    settings = db.query(Settings).all()
-    result = {s.key: s.value for s in settings}
+    result = settings_service.get_all_settings(db)
     
-    safe_result = {}
-    for key in SETTING_KEYS:
-        value = result.get(key, "")
-        if key in ["imap_password", "smtp_password", "openai_api_key"] and value:
-            safe_result[key] = "********"
-        else:
-            safe_result[key] = value or ""
+    safe_result = {key: result.get(key) or "" for key in SETTING_KEYS}
+    for key in MASKED_KEYS:
+        if safe_result[key]:
+            safe_result[key] = MASKED_VALUE
     
-    return safe_result
+    return ORJSONResponse(safe_result)
 
 
 @router.put("/")
 def update_settings(request: SettingsUpdate, db: Session = Depends(get_db)):
-    for key, value in request.settings.items():
-        if key in SETTING_KEYS:
-            if value and value != "********":
-                set_setting(db, key, value)
+    # Masked secrets and blanks mean "leave unchanged"
+    save_settings(db, {
+        key: value for key, value in request.settings.items()
+        if key in _SETTING_KEY_SET and value and value != MASKED_VALUE
+    })
     return {"status": "updated"}
 
 
@@ -67,12 +58,13 @@ def update_settings(request: SettingsUpdate, db: Session = Depends(get_db)):
 def test_imap_connection(db: Session = Depends(get_db)):
     import imaplib
     
-    host = get_setting(db, "imap_host")
-    port = int(get_setting(db, "imap_port") or "993")
-    username = get_setting(db, "imap_username")
-    password = get_setting(db, "imap_password")
+    settings = settings_service.get_all_settings(db)
+    host = settings.get("imap_host")
+    port = int(settings.get("imap_port") or "993")
+    username = settings.get("imap_username")
+    password = settings.get("imap_password")
     
-    if not all([host, username, password]):
+    if not (host and username and password):
         return {"success": False, "message": "IMAP settings not configured"}
     
     try:
@@ -88,12 +80,13 @@ def test_imap_connection(db: Session = Depends(get_db)):
 def test_smtp_connection(db: Session = Depends(get_db)):
     import smtplib
     
-    host = get_setting(db, "smtp_host")
-    port = int(get_setting(db, "smtp_port") or "587")
-    username = get_setting(db, "smtp_username")
-    password = get_setting(db, "smtp_password")
+    settings = settings_service.get_all_settings(db)
+    host = settings.get("smtp_host")
+    port = int(settings.get("smtp_port") or "587")
+    username = settings.get("smtp_username")
+    password = settings.get("smtp_password")
     
-    if not all([host, username, password]):
+    if not (host and username and password):
         return {"success": False, "message": "SMTP settings not configured"}
     
     try:
@@ -112,20 +105,23 @@ class SchedulerUpdate(BaseModel):
 
 @router.get("/scheduler")
 def get_scheduler(db: Session = Depends(get_db)):
-    enabled = get_setting(db, "scheduler_enabled") == "true"
-    interval = int(get_setting(db, "scheduler_interval_minutes") or "5")
+    settings = settings_service.get_all_settings(db)
+    enabled = settings.get("scheduler_enabled") == "true"
+    interval = int(settings.get("scheduler_interval_minutes") or "5")
     status = get_scheduler_status()
-    return {
+    return ORJSONResponse({
         "enabled": enabled,
         "interval_minutes": interval,
         "running": status["running"]
-    }
+    })
 
 
 @router.post("/scheduler")
 def update_scheduler(request: SchedulerUpdate, db: Session = Depends(get_db)):
-    set_setting(db, "scheduler_enabled", "true" if request.enabled else "false")
-    set_setting(db, "scheduler_interval_minutes", str(request.interval_minutes))
+    save_settings(db, {
+        "scheduler_enabled": "true" if request.enabled else "false",
+        "scheduler_interval_minutes": str(request.interval_minutes),
+    })
     
     if request.enabled:
         stop_scheduler()
@@ -138,15 +134,15 @@ def update_scheduler(request: SchedulerUpdate, db: Session = Depends(get_db)):
 
 @router.post("/scheduler/start")
 def start_scheduler_endpoint(db: Session = Depends(get_db)):
-    interval = int(get_setting(db, "scheduler_interval_minutes") or "5")
-    set_setting(db, "scheduler_enabled", "true")
+    interval = int(settings_service.get_setting(db, "scheduler_interval_minutes") or "5")
+    save_settings(db, {"scheduler_enabled": "true"})
     start_scheduler(interval)
     return {"status": "started", "interval_minutes": interval}
 
 
 @router.post("/scheduler/stop")
 def stop_scheduler_endpoint(db: Session = Depends(get_db)):
-    set_setting(db, "scheduler_enabled", "false")
+    save_settings(db, {"scheduler_enabled": "false"})
     stop_scheduler()
     return {"status": "stopped"}
 
@@ -160,23 +156,27 @@ class SlackSettings(BaseModel):
 
 @router.get("/slack")
 def get_slack_settings(db: Session = Depends(get_db)):
-    webhook_url = get_setting(db, "slack_webhook_url") or ""
-    return {
-        "webhook_url": "********" if webhook_url else "",
-        "notify_on_new": get_setting(db, "slack_notify_on_new") == "true",
-        "notify_on_urgent": get_setting(db, "slack_notify_on_urgent") != "false",
-        "notify_on_process": get_setting(db, "slack_notify_on_process") == "true",
+    settings = settings_service.get_all_settings(db)
+    webhook_url = settings.get("slack_webhook_url") or ""
+    return ORJSONResponse({
+        "webhook_url": MASKED_VALUE if webhook_url else "",
+        "notify_on_new": settings.get("slack_notify_on_new") == "true",
+        "notify_on_urgent": settings.get("slack_notify_on_urgent") != "false",
+        "notify_on_process": settings.get("slack_notify_on_process") == "true",
         "configured": bool(webhook_url)
-    }
+    })
 
 
 @router.post("/slack")
 def update_slack_settings(request: SlackSettings, db: Session = Depends(get_db)):
-    if request.webhook_url and request.webhook_url != "********":
-        set_setting(db, "slack_webhook_url", request.webhook_url)
-    set_setting(db, "slack_notify_on_new", "true" if request.notify_on_new else "false")
-    set_setting(db, "slack_notify_on_urgent", "true" if request.notify_on_urgent else "false")
-    set_setting(db, "slack_notify_on_process", "true" if request.notify_on_process else "false")
+    values = {
+        "slack_notify_on_new": "true" if request.notify_on_new else "false",
+        "slack_notify_on_urgent": "true" if request.notify_on_urgent else "false",
+        "slack_notify_on_process": "true" if request.notify_on_process else "false",
+    }
+    if request.webhook_url and request.webhook_url != MASKED_VALUE:
+        values["slack_webhook_url"] = request.webhook_url
+    save_settings(db, values)
     return {"status": "updated"}
 
 
@@ -199,19 +199,21 @@ class AutoResponderSettings(BaseModel):
 @router.get("/auto-responder")
 def get_auto_responder_settings(db: Session = Depends(get_db)):
     from app.services.auto_responder_service import DEFAULT_AUTO_RESPONSE_TEMPLATE
-    enabled = get_setting(db, "auto_responder_enabled") == "true"
-    template = get_setting(db, "auto_responder_template") or DEFAULT_AUTO_RESPONSE_TEMPLATE
-    return {
+    settings = settings_service.get_all_settings(db)
+    enabled = settings.get("auto_responder_enabled") == "true"
+    template = settings.get("auto_responder_template") or DEFAULT_AUTO_RESPONSE_TEMPLATE
+    return ORJSONResponse({
         "enabled": enabled,
         "template": template
-    }
+    })
 
 
 @router.post("/auto-responder")
 def update_auto_responder_settings(request: AutoResponderSettings, db: Session = Depends(get_db)):
-    set_setting(db, "auto_responder_enabled", "true" if request.enabled else "false")
+    values = {"auto_responder_enabled": "true" if request.enabled else "false"}
     if request.template:
-        set_setting(db, "auto_responder_template", request.template)
+        values["auto_responder_template"] = request.template
+    save_settings(db, values)
     return {"status": "updated"}
 
 
@@ -225,14 +227,16 @@ class EmailNotificationSettings(BaseModel):
 def get_email_notification_settings(db: Session = Depends(get_db)):
     from app.services.email_notification_service import get_email_notification_settings as get_settings
     settings = get_settings(db)
-    return settings
+    return ORJSONResponse(settings)
 
 
 @router.post("/email-notifications")
 def update_email_notification_settings(request: EmailNotificationSettings, db: Session = Depends(get_db)):
-    set_setting(db, "email_notify_enabled", "true" if request.enabled else "false")
-    set_setting(db, "email_notify_urgent_only", "true" if request.urgent_only else "false")
-    set_setting(db, "email_notify_recipients", request.recipients)
+    save_settings(db, {
+        "email_notify_enabled": "true" if request.enabled else "false",
+        "email_notify_urgent_only": "true" if request.urgent_only else "false",
+        "email_notify_recipients": request.recipients,
+    })
     return {"status": "updated"}
 
 
@@ -241,8 +245,8 @@ def test_email_notification(db: Session = Depends(get_db)):
     from app.services.smtp_service import get_smtp_config
     from app.services.email_notification_service import get_notification_recipients, get_email_notification_settings as get_settings
     
-    config = get_smtp_config(db)
-    if not all(config[:4]):
+    host, _, username, password, _ = get_smtp_config(db)
+    if not (host and username and password):
         return {"success": False, "message": "SMTP not configured"}
     
     settings = get_settings(db)
@@ -3,7 +3,8 @@ from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, select
+from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel
 
 from app.database import get_db
@@ -11,6 +12,9 @@ from app.models import SatisfactionSurvey, Ticket
 
 router = APIRouter(prefix="/api/surveys", tags=["surveys"])
 
+# token_urlsafe(32) -> 43 URL-safe characters, matching survey_token String(43)
+SURVEY_TOKEN_BYTES = 32
+
 
 class SurveyResponse(BaseModel):
     id: int
@@ -48,31 +52,31 @@ def list_surveys(
     return surveys
 
 
+# Survey ratings are 1-5 stars
+RATING_VALUES = range(1, 6)
+
+
 @router.get("/stats")
 def get_survey_stats(db: Session = Depends(get_db)):
-    completed_surveys = db.query(SatisfactionSurvey).filter(
-        SatisfactionSurvey.completed_at.isnot(None)
-    ).all()
-    
-    total_completed = len(completed_surveys)
-    total_sent = db.query(SatisfactionSurvey).filter(
-        SatisfactionSurvey.sent_at.isnot(None)
-    ).count()
-    pending = db.query(SatisfactionSurvey).filter(
-        SatisfactionSurvey.sent_at.isnot(None),
-        SatisfactionSurvey.completed_at.is_(None)
-    ).count()
-    
-    if total_completed > 0:
-        ratings = [s.rating for s in completed_surveys]
-        avg_rating = round(sum(ratings) / len(ratings), 2)
-        rating_distribution = {}
-        for r in range(1, 6):
-            rating_distribution[str(r)] = ratings.count(r)
-    else:
-        avg_rating = 0
-        rating_distribution = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
-    
+    # Everything in one aggregate row instead of loading every completed survey
+    completed = SatisfactionSurvey.completed_at.isnot(None)
+    sent = SatisfactionSurvey.sent_at.isnot(None)
+    row = db.execute(
+        select(
+            func.count().filter(completed),
+            func.count().filter(sent),
+            func.count().filter(sent, SatisfactionSurvey.completed_at.is_(None)),
+            func.avg(SatisfactionSurvey.rating).filter(completed),
+            *(
+                func.count().filter(completed, SatisfactionSurvey.rating == rating)
+                for rating in RATING_VALUES
+            ),
+        )
+    ).one()
+    total_completed, total_sent, pending, avg_rating = row[:4]
+    
+    rating_distribution = {str(rating): count for rating, count in zip(RATING_VALUES, row[4:])}
+    avg_rating = round(float(avg_rating), 2) if total_completed > 0 and avg_rating is not None else 0
     response_rate = round((total_completed / total_sent * 100) if total_sent > 0 else 0, 1)
     
     return {
@@ -93,11 +97,11 @@ def create_survey(request: CreateSurveyRequest, db: Session = Depends(get_db)):
     
     existing = db.query(SatisfactionSurvey).filter(
         SatisfactionSurvey.ticket_id == request.ticket_id
-    ).first()
+    ).one_or_none()
     if existing:
         return {"status": "exists", "survey_id": existing.id, "token": existing.survey_token}
     
-    token = secrets.token_urlsafe(32)
+    token = secrets.token_urlsafe(SURVEY_TOKEN_BYTES)
     
     survey = SatisfactionSurvey(
         ticket_id=request.ticket_id,
@@ -106,7 +110,15 @@ def create_survey(request: CreateSurveyRequest, db: Session = Depends(get_db)):
         rating=0
     )
     db.add(survey)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request created the survey for this ticket first (uq_survey_ticket)
+        db.rollback()
+        existing = db.query(SatisfactionSurvey).filter(
+            SatisfactionSurvey.ticket_id == request.ticket_id
+        ).one()
+        return {"status": "exists", "survey_id": existing.id, "token": existing.survey_token}
     db.refresh(survey)
     
     return {"status": "created", "survey_id": survey.id, "token": survey.survey_token}
@@ -128,7 +140,7 @@ def mark_survey_sent(survey_id: int, db: Session = Depends(get_db)):
 def get_survey_by_token(token: str, db: Session = Depends(get_db)):
     survey = db.query(SatisfactionSurvey).filter(
         SatisfactionSurvey.survey_token == token
-    ).first()
+    ).one_or_none()
     if not survey:
         raise HTTPException(status_code=404, detail="Survey not found")
     
@@ -145,7 +157,7 @@ def get_survey_by_token(token: str, db: Session = Depends(get_db)):
 def submit_survey(token: str, request: SurveySubmitRequest, db: Session = Depends(get_db)):
     survey = db.query(SatisfactionSurvey).filter(
         SatisfactionSurvey.survey_token == token
-    ).first()
+    ).one_or_none()
     if not survey:
         raise HTTPException(status_code=404, detail="Survey not found")
     
@@ -1,5 +1,8 @@
+import os
+import threading
 from datetime import datetime
 from typing import List, Optional
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
@@ -10,6 +13,20 @@ from app.models import Template
 
 router = APIRouter(prefix="/api/templates", tags=["templates"])
 
+# Template lists (keyed by category filter) change rarely; cache them briefly.
+# Writes in this module clear the cache; other workers see changes within the TTL.
+_list_cache: TTLCache = TTLCache(maxsize=32, ttl=int(os.environ.get("TEMPLATE_CACHE_TTL", 60)))
+_list_cache_lock = threading.Lock()
+# Bumped on every invalidation so a load that raced with a write is not cached
+_list_generation = 0
+
+
+def _invalidate_list_cache():
+    global _list_generation
+    with _list_cache_lock:
+        _list_cache.clear()
+        _list_generation += 1
+
 
 class TemplateCreate(BaseModel):
     name: str
@@ -37,10 +54,21 @@ class TemplateResponse(BaseModel):
 
 @router.get("/", response_model=List[TemplateResponse])
 def list_templates(category: Optional[str] = None, db: Session = Depends(get_db)):
+    with _list_cache_lock:
+        cached = _list_cache.get(category)
+        generation = _list_generation
+    if cached is not None:
+        return cached
+    
     query = db.query(Template)
     if category:
         query = query.filter(Template.category == category)
-    templates = query.order_by(desc(Template.created_at)).all()
+    templates = [
+        TemplateResponse.model_validate(t) for t in query.order_by(desc(Template.created_at)).all()
+    ]
+    with _list_cache_lock:
+        if generation == _list_generation:
+            _list_cache[category] = templates
     return templates
 
 
@@ -54,6 +82,10 @@ def get_template(template_id: int, db: Session = Depends(get_db)):
 
 @router.post("/", response_model=TemplateResponse)
 def create_template(request: TemplateCreate, db: Session = Depends(get_db)):
+    existing = db.query(Template).filter(Template.name == request.name).first()
+    if existing:
+        raise HTTPException(status_code=400, detail="Template name already exists")
+    
     template = Template(
         name=request.name,
         category=request.category,
@@ -62,6 +94,7 @@ def create_template(request: TemplateCreate, db: Session = Depends(get_db)):
     db.add(template)
     db.commit()
     db.refresh(template)
+    _invalidate_list_cache()
     return template
 
 
@@ -72,6 +105,12 @@ def update_template(template_id: int, request: TemplateUpdate, db: Session = Dep
         raise HTTPException(status_code=404, detail="Template not found")
     
     if request.name is not None:
+        existing = db.query(Template).filter(
+            Template.name == request.name,
+            Template.id != template_id
+        ).first()
+        if existing:
+            raise HTTPException(status_code=400, detail="Template name already exists")
         template.name = request.name
     if request.category is not None:
         template.category = request.category
@@ -80,6 +119,7 @@ def update_template(template_id: int, request: TemplateUpdate, db: Session = Dep
     
     db.commit()
     db.refresh(template)
+    _invalidate_list_cache()
     return template
 
 
@@ -91,4 +131,5 @@ def delete_template(template_id: int, db: Session = Depends(get_db)):
     
     db.delete(template)
     db.commit()
+    _invalidate_list_cache()
     return {"status": "deleted"}
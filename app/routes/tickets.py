@@ -33,27 +33,38 @@ TROUBLESHOOTING:
 - AI processing fails: Check OPENAI_API_KEY is set correctly
 - Send fails: Check SMTP settings in the Settings page
 - Duplicate tickets: The system checks message_id to prevent duplicates
+- Dashboard counts lag behind a change: the /stats endpoints are cached for
+  STATS_CACHE_TTL seconds (default 30); writes through this module clear
+  the cache, but tickets created by the background scheduler or another
+  worker show up only when it expires
 """
 
 import csv
+import functools
 import io
+import os
+import threading
 from datetime import datetime, timedelta
 from typing import List, Optional
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, or_, func
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload
+from sqlalchemy import Date, DateTime, cast, desc, literal_column, or_, func, select
 from pydantic import BaseModel
 
-from app.database import get_db
-from app.models import Ticket, TicketMessage, ApprovalStatus, Settings, TeamMember
+from app.database import SessionLocal, get_db
+from app.models import Ticket, TicketMessage, ApprovalStatus, TeamMember
 from app.services.imap_service import fetch_unread_emails
+from app.services.stats_service import ticket_daily_stats, get_last_refreshed_at
+from app.services.settings_service import get_all_settings, get_setting, save_settings
 from app.services.ai_service import process_ticket
 from app.services.approval_service import approve_ticket, reject_ticket, send_approved_response
 from app.services.slack_service import notify_new_ticket, notify_urgent_ticket, notify_ticket_processed
 from app.services.auto_responder_service import send_acknowledgment
 from app.services.sla_service import update_ticket_sla, get_priority_queue, get_sla_summary, update_all_sla_status
 from app.services.email_notification_service import send_urgent_ticket_notification
+from app.services.scheduler_service import process_unprocessed_tickets
 
 # Create router with /api/tickets prefix
 router = APIRouter(prefix="/api/tickets", tags=["tickets"])
@@ -156,8 +167,48 @@ class AssignTicketRequest(BaseModel):
 # ============================================================================
 # STATISTICS AND ANALYTICS ENDPOINTS
 # ============================================================================
+# The dashboard polls these, and each one aggregates over the whole tickets
+# table (or the stats view), so results are cached per endpoint + query
+# parameters for STATS_CACHE_TTL seconds. Ticket writes in this module call
+# _invalidate_stats_cache(); other changes appear within the TTL.
+
+STATS_CACHE_TTL = int(os.environ.get("STATS_CACHE_TTL", 30))
+
+_stats_cache: TTLCache = TTLCache(maxsize=128, ttl=max(STATS_CACHE_TTL, 1))
+_stats_cache_lock = threading.Lock()
+# Bumped on every invalidation so a result computed during a write is not cached
+_stats_generation = 0
+
+
+def _invalidate_stats_cache():
+    global _stats_generation
+    with _stats_cache_lock:
+        _stats_cache.clear()
+        _stats_generation += 1
+
+
+def cached_stats(endpoint):
+    """Cache a stats endpoint's result, keyed on its name and query parameters."""
+    @functools.wraps(endpoint)
+    def wrapper(*, db: Session, **params):
+        key = (endpoint.__name__, tuple(sorted(params.items())))
+        with _stats_cache_lock:
+            cached = _stats_cache.get(key)
+            generation = _stats_generation
+        if cached is not None:
+            return cached
+        
+        result = endpoint(db=db, **params)
+        if STATS_CACHE_TTL > 0:
+            with _stats_cache_lock:
+                if generation == _stats_generation:
+                    _stats_cache[key] = result
+        return result
+    return wrapper
+
 
 @router.get("/stats/summary")
+@cached_stats
 def get_stats(db: Session = Depends(get_db)):
     """
     Get summary statistics for the dashboard overview.
@@ -170,10 +221,15 @@ def get_stats(db: Session = Depends(get_db)):
     
     Used by the main dashboard to show the current workload.
     """
-    total = db.query(Ticket).count()
-    pending = db.query(Ticket).filter(Ticket.approval_status == ApprovalStatus.PENDING.value).count()
-    approved = db.query(Ticket).filter(Ticket.approval_status == ApprovalStatus.APPROVED.value).count()
-    rejected = db.query(Ticket).filter(Ticket.approval_status == ApprovalStatus.REJECTED.value).count()
+    # All four counts in one pass over tickets
+    total, pending, approved, rejected = db.execute(
+        select(
+            func.count(),
+            func.count().filter(Ticket.approval_status == ApprovalStatus.PENDING.value),
+            func.count().filter(Ticket.approval_status == ApprovalStatus.APPROVED.value),
+            func.count().filter(Ticket.approval_status == ApprovalStatus.REJECTED.value),
+        ).select_from(Ticket)
+    ).one()
     
     return {
         "total": total,
@@ -184,6 +240,7 @@ def get_stats(db: Session = Depends(get_db)):
 
 
 @router.get("/stats/analytics")
+@cached_stats
 def get_analytics(db: Session = Depends(get_db)):
     """
     Get detailed analytics for charts and reports.
@@ -192,27 +249,40 @@ def get_analytics(db: Session = Depends(get_db)):
     - by_category: Ticket counts grouped by category (for pie chart)
     - by_urgency: Ticket counts grouped by urgency (for bar chart)
     - Various rate calculations (approval rate, send rate, etc.)
+    - last_refreshed_at: When the underlying counts were last recomputed
     
     Used by the Analytics section of the dashboard.
+    
+    Reads the pre-aggregated ticket_daily_stats materialized view rather
+    than scanning tickets, so the numbers can be a few minutes old.
     """
-    # Count tickets by category
-    categories = db.query(
-        Ticket.category,
-        func.count(Ticket.id).label('count')
-    ).filter(Ticket.category.isnot(None)).group_by(Ticket.category).all()
+    stats = ticket_daily_stats.c
+    
+    # Count tickets by category ('' in the view means no category)
+    categories = db.execute(
+        select(stats.category, func.sum(stats.ticket_count))
+        .where(stats.category != "")
+        .group_by(stats.category)
+    ).all()
     
     # Count tickets by urgency
-    urgencies = db.query(
-        Ticket.urgency,
-        func.count(Ticket.id).label('count')
-    ).filter(Ticket.urgency.isnot(None)).group_by(Ticket.urgency).all()
+    urgencies = db.execute(
+        select(stats.urgency, func.sum(stats.ticket_count))
+        .where(stats.urgency != "")
+        .group_by(stats.urgency)
+    ).all()
     
-    # Calculate totals and rates
-    total = db.query(Ticket).count()
-    approved = db.query(Ticket).filter(Ticket.approval_status == ApprovalStatus.APPROVED.value).count()
-    rejected = db.query(Ticket).filter(Ticket.approval_status == ApprovalStatus.REJECTED.value).count()
-    sent = db.query(Ticket).filter(Ticket.sent_at.isnot(None)).count()
-    ai_processed = db.query(Ticket).filter(Ticket.ai_processed == True).count()
+    # Calculate totals and rates (all in one pass over the view)
+    totals = db.execute(
+        select(
+            func.coalesce(func.sum(stats.ticket_count), 0),
+            func.coalesce(func.sum(stats.ticket_count).filter(stats.approval_status == ApprovalStatus.APPROVED.value), 0),
+            func.coalesce(func.sum(stats.ticket_count).filter(stats.approval_status == ApprovalStatus.REJECTED.value), 0),
+            func.coalesce(func.sum(stats.sent_count), 0),
+            func.coalesce(func.sum(stats.ai_processed_count), 0),
+        )
+    ).one()
+    total, approved, rejected, sent, ai_processed = (int(v) for v in totals)
     
     # Calculate percentages (avoid division by zero)
     approval_rate = round((approved / total * 100) if total > 0 else 0, 1)
@@ -220,8 +290,8 @@ def get_analytics(db: Session = Depends(get_db)):
     send_rate = round((sent / approved * 100) if approved > 0 else 0, 1)
     
     return {
-        "by_category": [{"name": c[0] or "Uncategorized", "value": c[1]} for c in categories],
-        "by_urgency": [{"name": u[0] or "Unassigned", "value": u[1]} for u in urgencies],
+        "by_category": [{"name": c[0] or "Uncategorized", "value": int(c[1])} for c in categories],
+        "by_urgency": [{"name": u[0] or "Unassigned", "value": int(u[1])} for u in urgencies],
         "total_tickets": total,
         "approved_count": approved,
         "rejected_count": rejected,
@@ -229,11 +299,13 @@ def get_analytics(db: Session = Depends(get_db)):
         "ai_processed_count": ai_processed,
         "approval_rate": approval_rate,
         "rejection_rate": rejection_rate,
-        "send_rate": send_rate
+        "send_rate": send_rate,
+        "last_refreshed_at": get_last_refreshed_at(db)
     }
 
 
 @router.get("/stats/performance")
+@cached_stats
 def get_performance_metrics(db: Session = Depends(get_db)):
     """
     Get performance metrics for team efficiency tracking.
@@ -245,30 +317,32 @@ def get_performance_metrics(db: Session = Depends(get_db)):
     
     Also includes today's activity metrics and approval by team member.
     """
-    tickets = db.query(Ticket).filter(Ticket.ai_processed == True).all()
-    
-    # Calculate time deltas for processed tickets
-    processing_times = []  # Time for AI to process
-    approval_times = []    # Time to get human approval
-    resolution_times = []  # Time to send final response
-    
-    for ticket in tickets:
-        # AI processing time (in hours)
-        if ticket.received_at and ticket.updated_at and ticket.ai_processed:
-            processing_times.append((ticket.updated_at - ticket.received_at).total_seconds() / 3600)
-        
-        # Human approval time (in hours)
-        if ticket.received_at and ticket.approved_at:
-            approval_times.append((ticket.approved_at - ticket.received_at).total_seconds() / 3600)
-        
-        # Total resolution time (in hours)
-        if ticket.received_at and ticket.sent_at:
-            resolution_times.append((ticket.sent_at - ticket.received_at).total_seconds() / 3600)
-    
-    # Calculate averages
-    avg_processing_time = round(sum(processing_times) / len(processing_times), 2) if processing_times else 0
-    avg_approval_time = round(sum(approval_times) / len(approval_times), 2) if approval_times else 0
-    avg_resolution_time = round(sum(resolution_times) / len(resolution_times), 2) if resolution_times else 0
+    # Averages (in hours) and today's counts in one aggregate pass, instead
+    # of loading every processed ticket. count(x) skips NULLs, so each
+    # total only counts tickets that have both timestamps.
+    processed = Ticket.ai_processed == True
+    processing_hours = func.extract("epoch", Ticket.updated_at - Ticket.received_at) / 3600
+    approval_hours = func.extract("epoch", Ticket.approved_at - Ticket.received_at) / 3600
+    resolution_hours = func.extract("epoch", Ticket.sent_at - Ticket.received_at) / 3600
+    received_today = func.date(Ticket.received_at) == func.current_date()
+    
+    row = db.execute(
+        select(
+            func.avg(processing_hours).filter(processed),
+            func.avg(approval_hours).filter(processed),
+            func.avg(resolution_hours).filter(processed),
+            func.count(processing_hours).filter(processed),
+            func.count(approval_hours).filter(processed),
+            func.count(resolution_hours).filter(processed),
+            func.count().filter(received_today),
+            func.count().filter(received_today, processed),
+            func.count().filter(func.date(Ticket.sent_at) == func.current_date()),
+        ).select_from(Ticket)
+    ).one()
+    avg_processing_time, avg_approval_time, avg_resolution_time = (
+        round(float(avg), 2) if avg is not None else 0 for avg in row[:3]
+    )
+    total_processed, total_approved, total_resolved, today_tickets, today_processed, today_sent = row[3:]
     
     # Count approvals by team member
     approved_by_counts = db.query(
@@ -278,27 +352,13 @@ def get_performance_metrics(db: Session = Depends(get_db)):
         Ticket.approved_by.isnot(None)
     ).group_by(Ticket.approved_by).all()
     
-    # Today's metrics
-    today_tickets = db.query(Ticket).filter(
-        func.date(Ticket.received_at) == func.current_date()
-    ).count()
-    
-    today_processed = db.query(Ticket).filter(
-        func.date(Ticket.received_at) == func.current_date(),
-        Ticket.ai_processed == True
-    ).count()
-    
-    today_sent = db.query(Ticket).filter(
-        func.date(Ticket.sent_at) == func.current_date()
-    ).count()
-    
     return {
         "avg_processing_time_hours": avg_processing_time,
         "avg_approval_time_hours": avg_approval_time,
         "avg_resolution_time_hours": avg_resolution_time,
-        "total_processed": len(processing_times),
-        "total_approved": len(approval_times),
-        "total_resolved": len(resolution_times),
+        "total_processed": total_processed,
+        "total_approved": total_approved,
+        "total_resolved": total_resolved,
         "by_approver": [{"name": a[0] or "System", "count": a[1]} for a in approved_by_counts],
         "today_tickets": today_tickets,
         "today_processed": today_processed,
@@ -307,6 +367,7 @@ def get_performance_metrics(db: Session = Depends(get_db)):
 
 
 @router.get("/stats/trends")
+@cached_stats
 def get_volume_trends(days: int = Query(30, ge=7, le=90), db: Session = Depends(get_db)):
     """
     Get ticket volume trends over time.
@@ -316,41 +377,38 @@ def get_volume_trends(days: int = Query(30, ge=7, le=90), db: Session = Depends(
     
     Returns daily ticket counts for trend charts.
     Includes dates with zero tickets for continuous chart data.
+    Counts come from the ticket_daily_stats materialized view.
     """
     end_date = datetime.now().date()
     start_date = end_date - timedelta(days=days - 1)
     
-    # Generate all dates in range (to include zeros)
-    date_range = []
-    current = start_date
-    while current <= end_date:
-        date_range.append(current)
-        current += timedelta(days=1)
-    
-    # Get actual counts from database
-    daily_counts = db.query(
-        func.date(Ticket.received_at).label('date'),
-        func.count(Ticket.id).label('count')
-    ).filter(
-        func.date(Ticket.received_at) >= start_date,
-        func.date(Ticket.received_at) <= end_date
-    ).group_by(func.date(Ticket.received_at)).all()
-    
-    count_dict = {str(row[0]): row[1] for row in daily_counts}
+    # Every date in the range (generate_series), left-joined to the daily
+    # counts from the pre-aggregated view, so days without tickets come
+    # back as 0 and the rows are already in chart order
+    stats = ticket_daily_stats.c
+    days_series = func.generate_series(
+        cast(start_date, DateTime), cast(end_date, DateTime), literal_column("interval '1 day'")
+    ).table_valued("day").render_derived(name="days")
+    day = cast(days_series.c.day, Date)
+    daily_counts = (
+        select(stats.day, func.sum(stats.ticket_count).label("ticket_count"))
+        .where(stats.day >= start_date, stats.day <= end_date)
+        .group_by(stats.day)
+        .subquery()
+    )
+    rows = db.execute(
+        select(day, func.coalesce(daily_counts.c.ticket_count, 0))
+        .select_from(days_series.outerjoin(daily_counts, daily_counts.c.day == day))
+        .order_by(days_series.c.day)
+    ).all()
     
-    # Build complete dataset with zeros for missing dates
-    trends = []
-    for date in date_range:
-        date_str = str(date)
-        trends.append({
-            "date": date_str,
-            "count": count_dict.get(date_str, 0)
-        })
+    trends = [{"date": str(row[0]), "count": int(row[1])} for row in rows]
     
     return {
         "trends": trends,
         "total": sum(t["count"] for t in trends),
-        "average": round(sum(t["count"] for t in trends) / len(trends), 1) if trends else 0
+        "average": round(sum(t["count"] for t in trends) / len(trends), 1) if trends else 0,
+        "last_refreshed_at": get_last_refreshed_at(db)
     }
 
 
@@ -358,13 +416,80 @@ def get_volume_trends(days: int = Query(30, ge=7, le=90), db: Session = Depends(
 # EXPORT ENDPOINT
 # ============================================================================
 
+# Export columns, in CSV order
+EXPORT_HEADER = [
+    "ID", "Sender Email", "Subject", "Received At", "Category", "Urgency",
+    "Summary", "Fix Steps", "Draft Response", "Status", "AI Processed", 
+    "Escalation Required", "Approved By", "Approved At", "Sent At", 
+    "Created At", "Updated At"
+]
+_EXPORT_COLUMNS = (
+    Ticket.id, Ticket.sender_email, Ticket.subject, Ticket.received_at,
+    Ticket.category, Ticket.urgency, Ticket.summary, Ticket.fix_steps,
+    Ticket.draft_response, Ticket.approval_status, Ticket.ai_processed,
+    Ticket.escalation_required, Ticket.approved_by, Ticket.approved_at,
+    Ticket.sent_at, Ticket.created_at, Ticket.updated_at,
+)
+# Rows fetched from the server-side cursor, and written per CSV chunk
+EXPORT_BATCH_SIZE = 1000
+
+
+def _format_timestamp(value: Optional[datetime]) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S") if value else ""
+
+
+def _generate_export_csv(stmt):
+    """
+    Yield the export as CSV text, one chunk per EXPORT_BATCH_SIZE tickets.
+    
+    Uses its own session (the request's may be closed before the response
+    finishes streaming) and a server-side cursor, so memory stays at one
+    batch however many tickets match.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_HEADER)
+    
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for rows in result.partitions():
+            writer.writerows([
+                t.id,
+                t.sender_email,
+                t.subject,
+                _format_timestamp(t.received_at),
+                t.category or "",
+                t.urgency or "",
+                t.summary or "",
+                t.fix_steps or "",
+                t.draft_response or "",
+                t.approval_status,
+                "Yes" if t.ai_processed else "No",
+                "Yes" if t.escalation_required else "No",
+                t.approved_by or "",
+                _format_timestamp(t.approved_at),
+                _format_timestamp(t.sent_at),
+                _format_timestamp(t.created_at),
+                _format_timestamp(t.updated_at)
+            ] for t in rows)
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+        
+        # Header only, when no ticket matched
+        if output.tell():
+            yield output.getvalue()
+    finally:
+        db.close()
+
+
 @router.get("/export")
 def export_tickets(
     status: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     urgency: Optional[str] = Query(None),
-    search: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    search: Optional[str] = Query(None)
 ):
     """
     Export tickets to CSV file.
@@ -372,20 +497,22 @@ def export_tickets(
     Supports the same filters as list_tickets so users can export
     a specific subset of tickets (e.g., only High urgency, or only Billing).
     
-    Returns a downloadable CSV file with all ticket data.
+    Returns a downloadable CSV file with all ticket data. The file is
+    streamed while the tickets are read, so the download starts at once
+    and large exports are never held in memory.
     """
-    query = db.query(Ticket)
+    stmt = select(*_EXPORT_COLUMNS)
     
     # Apply filters
     if status:
-        query = query.filter(Ticket.approval_status == status)
+        stmt = stmt.where(Ticket.approval_status == status)
     if category:
-        query = query.filter(Ticket.category == category)
+        stmt = stmt.where(Ticket.category == category)
     if urgency:
-        query = query.filter(Ticket.urgency == urgency)
+        stmt = stmt.where(Ticket.urgency == urgency)
     if search:
         search_term = f"%{search}%"
-        query = query.filter(
+        stmt = stmt.where(
             or_(
                 Ticket.sender_email.ilike(search_term),
                 Ticket.subject.ilike(search_term),
@@ -393,48 +520,12 @@ def export_tickets(
             )
         )
     
-    tickets = query.order_by(desc(Ticket.received_at)).all()
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header row
-    writer.writerow([
-        "ID", "Sender Email", "Subject", "Received At", "Category", "Urgency",
-        "Summary", "Fix Steps", "Draft Response", "Status", "AI Processed", 
-        "Escalation Required", "Approved By", "Approved At", "Sent At", 
-        "Created At", "Updated At"
-    ])
-    
-    # Write data rows
-    for ticket in tickets:
-        writer.writerow([
-            ticket.id,
-            ticket.sender_email,
-            ticket.subject,
-            ticket.received_at.strftime("%Y-%m-%d %H:%M:%S") if ticket.received_at else "",
-            ticket.category or "",
-            ticket.urgency or "",
-            ticket.summary or "",
-            ticket.fix_steps or "",
-            ticket.draft_response or "",
-            ticket.approval_status,
-            "Yes" if ticket.ai_processed else "No",
-            "Yes" if ticket.escalation_required else "No",
-            ticket.approved_by or "",
-            ticket.approved_at.strftime("%Y-%m-%d %H:%M:%S") if ticket.approved_at else "",
-            ticket.sent_at.strftime("%Y-%m-%d %H:%M:%S") if ticket.sent_at else "",
-            ticket.created_at.strftime("%Y-%m-%d %H:%M:%S") if ticket.created_at else "",
-            ticket.updated_at.strftime("%Y-%m-%d %H:%M:%S") if ticket.updated_at else ""
-        ])
-    
-    output.seek(0)
+    stmt = stmt.order_by(desc(Ticket.received_at))
     filename = f"tickets_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
     
     # Return as streaming response for download
     return StreamingResponse(
-        iter([output.getvalue()]),
+        _generate_export_csv(stmt),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -443,6 +534,41 @@ def export_tickets(
 # ============================================================================
 # TICKET LISTING AND DETAIL ENDPOINTS
 # ============================================================================
+# List endpoints read plain rows with a Core select() instead of loading
+# Ticket ORM objects. This skips ORM object construction and identity-map
+# bookkeeping for every row, and fetches the assignee in the same query
+# (a LEFT JOIN) instead of one lazy load per ticket.
+
+_ASSIGNEE_COLUMNS = (
+    TeamMember.id.label("assignee_id"),
+    TeamMember.name.label("assignee_name"),
+    TeamMember.email.label("assignee_email"),
+    TeamMember.role.label("assignee_role"),
+)
+
+
+def _select_ticket_rows():
+    """Base select for ticket list rows: every ticket column plus the assignee."""
+    return select(*Ticket.__table__.c, *_ASSIGNEE_COLUMNS).outerjoin(
+        TeamMember, TeamMember.id == Ticket.assigned_to
+    )
+
+
+def _ticket_rows(db: Session, stmt) -> List[dict]:
+    """Run a _select_ticket_rows() query and shape rows like TicketResponse."""
+    tickets = []
+    for row in db.execute(stmt).mappings():
+        ticket = dict(row)
+        assignee = {
+            "id": ticket.pop("assignee_id"),
+            "name": ticket.pop("assignee_name"),
+            "email": ticket.pop("assignee_email"),
+            "role": ticket.pop("assignee_role"),
+        }
+        ticket["assignee"] = assignee if assignee["id"] is not None else None
+        tickets.append(ticket)
+    return tickets
+
 
 @router.get("/", response_model=List[TicketResponse])
 def list_tickets(
@@ -468,18 +594,18 @@ def list_tickets(
     
     Returns tickets ordered by received_at (newest first).
     """
-    query = db.query(Ticket)
+    query = _select_ticket_rows()
     
     # Apply filters
     if status:
-        query = query.filter(Ticket.approval_status == status)
+        query = query.where(Ticket.approval_status == status)
     if category:
-        query = query.filter(Ticket.category == category)
+        query = query.where(Ticket.category == category)
     if urgency:
-        query = query.filter(Ticket.urgency == urgency)
+        query = query.where(Ticket.urgency == urgency)
     if search:
         search_term = f"%{search}%"
-        query = query.filter(
+        query = query.where(
             or_(
                 Ticket.sender_email.ilike(search_term),
                 Ticket.subject.ilike(search_term),
@@ -487,19 +613,18 @@ def list_tickets(
             )
         )
     if sla_breached is not None:
-        query = query.filter(Ticket.sla_breached == sla_breached)
+        query = query.where(Ticket.sla_breached == sla_breached)
     if assigned_to is not None:
         if assigned_to == "unassigned":
-            query = query.filter(Ticket.assigned_to.is_(None))
+            query = query.where(Ticket.assigned_to.is_(None))
         else:
             try:
                 member_id = int(assigned_to)
-                query = query.filter(Ticket.assigned_to == member_id)
+                query = query.where(Ticket.assigned_to == member_id)
             except ValueError:
                 pass  # Invalid ID, ignore filter
     
-    tickets = query.order_by(desc(Ticket.received_at)).all()
-    return tickets
+    return _ticket_rows(db, query.order_by(desc(Ticket.received_at)))
 
 
 @router.get("/customer/{email}", response_model=List[TicketResponse])
@@ -520,11 +645,10 @@ def get_customer_history(
     
     Returns up to 10 most recent tickets from this customer.
     """
-    query = db.query(Ticket).filter(Ticket.sender_email == email)
+    query = _select_ticket_rows().where(Ticket.sender_email == email)
     if exclude_ticket_id:
-        query = query.filter(Ticket.id != exclude_ticket_id)
-    tickets = query.order_by(desc(Ticket.received_at)).limit(10).all()
-    return tickets
+        query = query.where(Ticket.id != exclude_ticket_id)
+    return _ticket_rows(db, query.order_by(desc(Ticket.received_at)).limit(10))
 
 
 @router.get("/{ticket_id}", response_model=TicketDetailResponse)
@@ -537,7 +661,15 @@ def get_ticket(ticket_id: int, db: Session = Depends(get_db)):
     
     Raises HTTPException 404 if ticket not found.
     """
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    # Load the assignee in the same query and all messages in one more,
+    # rather than lazy loading each during serialization. Any other
+    # relationship touched while serializing raises instead of silently
+    # issuing a query.
+    ticket = db.query(Ticket).options(
+        joinedload(Ticket.assignee),
+        selectinload(Ticket.messages),
+        raiseload("*")
+    ).filter(Ticket.id == ticket_id).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     return ticket
@@ -569,83 +701,99 @@ def fetch_emails(db: Session = Depends(get_db)):
     """
     # Fetch emails from IMAP server
     emails = fetch_unread_emails(db)
-    created_count = 0
     
-    for email_data in emails:
-        # Skip if we already have this email
-        existing = db.query(Ticket).filter(
-            Ticket.message_id == email_data["message_id"]
-        ).first()
-        
-        if existing:
-            continue
-        
-        # Check if this is a reply to an existing ticket
-        existing_thread = None
-        if email_data.get("in_reply_to"):
-            existing_thread = db.query(Ticket).filter(
-                or_(
-                    Ticket.message_id == email_data["in_reply_to"],
-                    Ticket.thread_id == email_data["thread_id"]
-                )
-            ).first()
-        
-        if existing_thread:
-            # Add as new message to existing ticket
-            message = TicketMessage(
-                ticket_id=existing_thread.id,
-                sender_email=email_data["sender_email"],
-                subject=email_data["subject"],
-                body=email_data["body"],
-                is_incoming=True,
-                message_id=email_data["message_id"],
-                in_reply_to=email_data.get("in_reply_to")
-            )
-            db.add(message)
-            # Reset ticket for re-processing with new message
-            existing_thread.approval_status = ApprovalStatus.PENDING.value
-            existing_thread.ai_processed = False
-        else:
-            # Create new ticket
-            ticket = Ticket(
-                sender_email=email_data["sender_email"],
-                subject=email_data["subject"],
-                received_at=email_data["received_at"],
-                message_id=email_data["message_id"],
-                in_reply_to=email_data.get("in_reply_to"),
-                thread_id=email_data.get("thread_id") or email_data["message_id"],
-            )
-            db.add(ticket)
-            db.flush()  # Get the ticket ID
-            
-            # Create initial message
-            message = TicketMessage(
-                ticket_id=ticket.id,
-                sender_email=email_data["sender_email"],
-                subject=email_data["subject"],
-                body=email_data["body"],
-                is_incoming=True,
-                message_id=email_data["message_id"],
-            )
-            db.add(message)
-            db.flush()
-            created_count += 1
+    # Look up which emails were already imported in one query
+    message_ids = [e["message_id"] for e in emails if e["message_id"]]
+    seen_ids = {
+        row[0] for row in db.query(Ticket.message_id).filter(Ticket.message_id.in_(message_ids)).all()
+    } if message_ids else set()
+    
+    # Tickets created in this batch, by message_id and thread_id, so a
+    # reply fetched together with its original still joins its thread
+    batch_threads = {}
+    new_tickets = []
+    
+    # Nothing is flushed until the whole batch is built; new tickets and
+    # their messages then go to the database in one flush
+    with db.no_autoflush:
+        for email_data in emails:
+            # Skip if we already have this email
+            if email_data["message_id"] in seen_ids:
+                continue
+            seen_ids.add(email_data["message_id"])
             
-            # Send automatic acknowledgment to customer
-            send_acknowledgment(
-                to_email=email_data["sender_email"],
-                ticket_id=ticket.id,
-                subject=email_data["subject"],
-                db=db
-            )
+            # Check if this is a reply to an existing ticket
+            existing_thread = None
+            if email_data.get("in_reply_to"):
+                existing_thread = (
+                    batch_threads.get(email_data["in_reply_to"])
+                    or batch_threads.get(email_data["thread_id"])
+                )
+                if existing_thread is None:
+                    existing_thread = db.query(Ticket).filter(
+                        or_(
+                            Ticket.message_id == email_data["in_reply_to"],
+                            Ticket.thread_id == email_data["thread_id"]
+                        )
+                    ).first()
             
-            # Send Slack notification if enabled
-            notify_on_new = db.query(Settings).filter(Settings.key == "slack_notify_on_new").first()
-            if notify_on_new and notify_on_new.value == "true":
-                notify_new_ticket(db, ticket)
+            if existing_thread:
+                # Add as new message to existing ticket
+                message = TicketMessage(
+                    ticket=existing_thread,
+                    sender_email=email_data["sender_email"],
+                    subject=email_data["subject"],
+                    body=email_data["body"],
+                    is_incoming=True,
+                    message_id=email_data["message_id"],
+                    in_reply_to=email_data.get("in_reply_to")
+                )
+                db.add(message)
+                # Reset ticket for re-processing with new message
+                existing_thread.approval_status = ApprovalStatus.PENDING.value
+                existing_thread.ai_processed = False
+            else:
+                # Create new ticket with its initial message
+                ticket = Ticket(
+                    sender_email=email_data["sender_email"],
+                    subject=email_data["subject"],
+                    received_at=email_data["received_at"],
+                    message_id=email_data["message_id"],
+                    in_reply_to=email_data.get("in_reply_to"),
+                    thread_id=email_data.get("thread_id") or email_data["message_id"],
+                )
+                ticket.messages.append(TicketMessage(
+                    sender_email=email_data["sender_email"],
+                    subject=email_data["subject"],
+                    body=email_data["body"],
+                    is_incoming=True,
+                    message_id=email_data["message_id"],
+                ))
+                db.add(ticket)
+                new_tickets.append(ticket)
+                batch_threads[ticket.message_id] = ticket
+                batch_threads[ticket.thread_id] = ticket
+    
+    db.flush()  # Insert the whole batch and assign ticket IDs
+    
+    # Notifications need ticket IDs, so they go out after the flush
+    notify_on_new = get_setting(db, "slack_notify_on_new") == "true"
+    for ticket in new_tickets:
+        # Send automatic acknowledgment to customer
+        send_acknowledgment(
+            to_email=ticket.sender_email,
+            ticket_id=ticket.id,
+            subject=ticket.subject,
+            db=db
+        )
+        
+        # Send Slack notification if enabled
+        if notify_on_new:
+            notify_new_ticket(db, ticket)
     
     db.commit()
-    return {"fetched": len(emails), "created": created_count}
+    _invalidate_stats_cache()
+    return {"fetched": len(emails), "created": len(new_tickets)}
 
 
 @router.post("/{ticket_id}/process")
@@ -704,8 +852,8 @@ def process_single_ticket(ticket_id: int, db: Session = Depends(get_db)):
         update_ticket_sla(db, ticket)
         
         # Send notifications for urgent tickets
-        notify_on_urgent = db.query(Settings).filter(Settings.key == "slack_notify_on_urgent").first()
-        if ticket.urgency == "High" and (not notify_on_urgent or notify_on_urgent.value != "false"):
+        notify_on_urgent = get_setting(db, "slack_notify_on_urgent")
+        if ticket.urgency == "High" and notify_on_urgent != "false":
             notify_urgent_ticket(db, ticket)
         else:
             notify_ticket_processed(db, ticket)
@@ -713,6 +861,7 @@ def process_single_ticket(ticket_id: int, db: Session = Depends(get_db)):
         # Send email notification for urgent tickets
         send_urgent_ticket_notification(db, ticket)
         
+        _invalidate_stats_cache()
         return {"status": "processed", "result": result}
     else:
         raise HTTPException(status_code=500, detail="AI processing failed")
@@ -728,42 +877,8 @@ def process_all_tickets(db: Session = Depends(get_db)):
     
     Returns the count of successfully processed tickets.
     """
-    unprocessed = db.query(Ticket).filter(Ticket.ai_processed == False).all()
-    processed_count = 0
-    
-    for ticket in unprocessed:
-        # Get the latest incoming message
-        latest_message = db.query(TicketMessage).filter(
-            TicketMessage.ticket_id == ticket.id,
-            TicketMessage.is_incoming == True
-        ).order_by(desc(TicketMessage.created_at)).first()
-        
-        if not latest_message:
-            continue
-        
-        # Send to AI for analysis
-        result = process_ticket(
-            ticket_id=ticket.id,
-            sender_email=ticket.sender_email,
-            subject=ticket.subject,
-            body=latest_message.body,
-            received_at=str(ticket.received_at),
-            db=db
-        )
-        
-        if result:
-            ticket.category = result["category"]
-            ticket.urgency = result["urgency"]
-            ticket.summary = result["summary"]
-            ticket.fix_steps = result["fix_steps"]
-            ticket.draft_response = result["draft_response"]
-            ticket.ai_processed = True
-            processed_count += 1
-            
-            update_ticket_sla(db, ticket)
-            send_urgent_ticket_notification(db, ticket)
-    
-    db.commit()
+    processed_count = process_unprocessed_tickets(db)
+    _invalidate_stats_cache()
     return {"processed": processed_count}
 
 
@@ -809,6 +924,7 @@ def approve(ticket_id: int, db: Session = Depends(get_db)):
     success = approve_ticket(db, ticket_id)
     if not success:
         raise HTTPException(status_code=404, detail="Ticket not found")
+    _invalidate_stats_cache()
     return {"status": "approved"}
 
 
@@ -826,6 +942,7 @@ def reject(ticket_id: int, db: Session = Depends(get_db)):
     success = reject_ticket(db, ticket_id)
     if not success:
         raise HTTPException(status_code=404, detail="Ticket not found")
+    _invalidate_stats_cache()
     return {"status": "rejected"}
 
 
@@ -845,6 +962,7 @@ def send_response(ticket_id: int, db: Session = Depends(get_db)):
     success = send_approved_response(db, ticket_id)
     if not success:
         raise HTTPException(status_code=400, detail="Could not send response")
+    _invalidate_stats_cache()
     return {"status": "sent"}
 
 
@@ -864,6 +982,7 @@ def bulk_approve(request: BulkActionRequest, db: Session = Depends(get_db)):
     for ticket_id in request.ticket_ids:
         if approve_ticket(db, ticket_id):
             approved_count += 1
+    _invalidate_stats_cache()
     return {"approved": approved_count}
 
 
@@ -878,6 +997,7 @@ def bulk_reject(request: BulkActionRequest, db: Session = Depends(get_db)):
     for ticket_id in request.ticket_ids:
         if reject_ticket(db, ticket_id):
             rejected_count += 1
+    _invalidate_stats_cache()
     return {"rejected": rejected_count}
 
 
@@ -895,6 +1015,7 @@ def bulk_send(request: BulkActionRequest, db: Session = Depends(get_db)):
     for ticket_id in request.ticket_ids:
         if send_approved_response(db, ticket_id):
             sent_count += 1
+    _invalidate_stats_cache()
     return {"sent": sent_count}
 
 
@@ -997,10 +1118,7 @@ def get_sla_settings(db: Session = Depends(get_db)):
     Returns the number of hours allowed for each urgency level.
     Defaults: High=4 hours, Medium=8 hours, Low=24 hours
     """
-    settings = db.query(Settings).filter(
-        Settings.key.in_(["sla_hours_high", "sla_hours_medium", "sla_hours_low"])
-    ).all()
-    settings_dict = {s.key: s.value for s in settings}
+    settings_dict = get_all_settings(db)
     
     return {
         "high_hours": int(settings_dict.get("sla_hours_high", 4)),
@@ -1017,16 +1135,9 @@ def update_sla_settings(request: SlaSettingsRequest, db: Session = Depends(get_d
     Sets the number of hours allowed for each urgency level.
     Affects SLA deadline calculation for newly processed tickets.
     """
-    for key, value in [
-        ("sla_hours_high", request.high_hours),
-        ("sla_hours_medium", request.medium_hours),
-        ("sla_hours_low", request.low_hours)
-    ]:
-        setting = db.query(Settings).filter(Settings.key == key).first()
-        if setting:
-            setting.value = str(value)
-        else:
-            db.add(Settings(key=key, value=str(value)))
-    
-    db.commit()
+    save_settings(db, {
+        "sla_hours_high": str(request.high_hours),
+        "sla_hours_medium": str(request.medium_hours),
+        "sla_hours_low": str(request.low_hours)
+    })
     return {"status": "updated"}
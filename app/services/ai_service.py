@@ -24,10 +24,11 @@ TROUBLESHOOTING:
 """
 
 import json
-import os
 from openai import OpenAI
 from typing import Dict, Any, Optional
 
+from app import config
+
 # ============================================================================
 # MASTER PROMPT
 # ============================================================================
@@ -124,13 +125,13 @@ def get_openai_key(db=None) -> Optional[str]:
     """
     # First, try to get from database settings (user-configured)
     if db:
-        from app.models import Settings
-        setting = db.query(Settings).filter(Settings.key == "openai_api_key").first()
-        if setting and setting.value:
-            return setting.value
+        from app.services.settings_service import get_setting
+        api_key = get_setting(db, "openai_api_key")
+        if api_key:
+            return api_key
     
-    # Fall back to environment variable
-    return os.environ.get("OPENAI_API_KEY")
+    # Fall back to environment variable (read once at startup by app.config)
+    return config.OPENAI_API_KEY
 
 
 def process_ticket(
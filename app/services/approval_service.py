@@ -1,6 +1,6 @@
 from datetime import datetime
 from sqlalchemy.orm import Session
-from app.models import Ticket, TicketMessage, ApprovalStatus
+from app.models import Ticket, TicketMessage, ApprovalStatus, MAX_EMAIL_LENGTH, MAX_SUBJECT_LENGTH
 from app.services.smtp_service import send_email
 
 
@@ -41,9 +41,8 @@ def send_approved_response(db: Session, ticket_id: int) -> bool:
     
     subject = f"Re: {ticket.subject}"
     
-    from app.models import Settings
-    settings = {s.key: s.value for s in db.query(Settings).all()}
-    from_email = settings.get("smtp_from_email") or "support@infinityworkitsolutions.com"
+    from app.services.settings_service import get_setting
+    from_email = get_setting(db, "smtp_from_email") or "support@infinityworkitsolutions.com"
     
     success = send_email(
         to_email=ticket.sender_email,
@@ -59,8 +58,8 @@ def send_approved_response(db: Session, ticket_id: int) -> bool:
         
         outgoing_message = TicketMessage(
             ticket_id=ticket.id,
-            sender_email=from_email,
-            subject=subject,
+            sender_email=from_email[:MAX_EMAIL_LENGTH],
+            subject=subject[:MAX_SUBJECT_LENGTH],
             body=ticket.draft_response,
             is_incoming=False,
             in_reply_to=ticket.message_id
@@ -18,8 +18,8 @@ InfinityWork IT Solutions Support Team"""
 
 
 def get_auto_responder_settings(db) -> dict:
-    from app.models import Settings
-    settings = {s.key: s.value for s in db.query(Settings).all()}
+    from app.services.settings_service import get_all_settings
+    settings = get_all_settings(db)
     return {
         "enabled": settings.get("auto_responder_enabled", "false").lower() == "true",
         "template": settings.get("auto_responder_template") or DEFAULT_AUTO_RESPONSE_TEMPLATE
@@ -1,6 +1,7 @@
 import re
 from sqlalchemy.orm import Session
-from app.models import Ticket, TeamMember, Settings
+from app.models import Ticket, TeamMember
+from app.services.settings_service import get_all_settings
 from app.services.smtp_service import send_email
 
 
@@ -10,14 +11,7 @@ def is_valid_email(email: str) -> bool:
 
 
 def get_email_notification_settings(db: Session) -> dict:
-    settings = db.query(Settings).filter(
-        Settings.key.in_([
-            "email_notify_enabled",
-            "email_notify_urgent_only",
-            "email_notify_recipients"
-        ])
-    ).all()
-    settings_dict = {s.key: s.value for s in settings}
+    settings_dict = get_all_settings(db)
     
     return {
         "enabled": settings_dict.get("email_notify_enabled", "false") == "true",
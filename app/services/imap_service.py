@@ -11,7 +11,9 @@ WORKFLOW:
 1. Connect to IMAP server using SSL (port 993)
 2. Log in with username/password
 3. Search for unread (UNSEEN) emails
-4. For each email, extract:
+4. Download them in batches of FETCH_BATCH_SIZE (one FETCH command per
+   batch instead of one round-trip per email)
+5. For each email, extract:
    - Sender email address
    - Subject line
    - Body content (plain text preferred over HTML)
@@ -38,7 +40,13 @@ from email.header import decode_header
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 import re
-import os
+
+from app import config
+from app.models import MAX_EMAIL_LENGTH, MAX_SUBJECT_LENGTH
+
+# Emails downloaded per IMAP FETCH command. Larger batches mean fewer round
+# trips; ~100 keeps the command line well under server request-size limits.
+FETCH_BATCH_SIZE = 100
 
 
 def get_imap_config(db=None):
@@ -61,21 +69,17 @@ def get_imap_config(db=None):
     """
     # Try database settings first
     if db:
-        from app.models import Settings
-        settings = {s.key: s.value for s in db.query(Settings).all()}
+        from app.services.settings_service import get_all_settings
+        settings = get_all_settings(db)
         host = settings.get("imap_host")
         port = int(settings.get("imap_port") or "993")
         username = settings.get("imap_username")
         password = settings.get("imap_password")
-        if all([host, username, password]):
+        if host and username and password:
             return host, port, username, password
     
-    # Fall back to environment variables
-    host = os.environ.get("IMAP_HOST", "")
-    port = int(os.environ.get("IMAP_PORT", "993"))
-    username = os.environ.get("IMAP_USERNAME", "")
-    password = os.environ.get("IMAP_PASSWORD", "")
-    return host, port, username, password
+    # Fall back to environment variables (read once at startup by app.config)
+    return config.IMAP_HOST, config.IMAP_PORT, config.IMAP_USERNAME, config.IMAP_PASSWORD
 
 
 def decode_mime_header(header_value: str) -> str:
@@ -191,6 +195,50 @@ def extract_thread_id(msg) -> Optional[str]:
     return None
 
 
+def parse_email(raw_email: bytes) -> Dict[str, Any]:
+    """
+    Parse a raw RFC822 email into the dictionary used for ticket creation.
+    
+    See fetch_unread_emails() for the returned keys.
+    """
+    msg = email.message_from_bytes(raw_email)
+    
+    # Extract sender email address
+    sender = decode_mime_header(msg.get("From", ""))
+    sender_email = ""
+    if "<" in sender and ">" in sender:
+        # Format: "Name <email@example.com>"
+        sender_email = sender.split("<")[1].split(">")[0]
+    else:
+        # Format: "email@example.com"
+        sender_email = sender
+    
+    # Extract other fields
+    subject = decode_mime_header(msg.get("Subject", ""))
+    message_id = msg.get("Message-ID", "").strip("<>")
+    in_reply_to = msg.get("In-Reply-To", "").strip("<>") if msg.get("In-Reply-To") else None
+    thread_id = extract_thread_id(msg)
+    body = extract_email_body(msg)
+    
+    # Parse the date header
+    date_str = msg.get("Date", "")
+    try:
+        received_at = email.utils.parsedate_to_datetime(date_str)
+    except:
+        received_at = datetime.utcnow()
+    
+    return {
+        # Truncated to fit the ticket columns
+        "sender_email": sender_email[:MAX_EMAIL_LENGTH],
+        "subject": subject[:MAX_SUBJECT_LENGTH],
+        "body": body,
+        "message_id": message_id,
+        "in_reply_to": in_reply_to,
+        "thread_id": thread_id or message_id,  # Use message_id if no thread
+        "received_at": received_at,
+    }
+
+
 def fetch_unread_emails(db=None) -> List[Dict[str, Any]]:
     """
     Fetch all unread emails from the configured IMAP inbox.
@@ -233,7 +281,7 @@ def fetch_unread_emails(db=None) -> List[Dict[str, Any]]:
     host, port, username, password = get_imap_config(db)
     
     # Check if IMAP is properly configured
-    if not all([host, username, password]):
+    if not (host and username and password):
         print("IMAP not configured")
         return []
     
@@ -252,51 +300,18 @@ def fetch_unread_emails(db=None) -> List[Dict[str, Any]]:
         
         email_ids = messages[0].split()
         
-        # Process each unread email
-        for email_id in email_ids:
-            # Fetch the full email (RFC822 format)
-            status, msg_data = mail.fetch(email_id, "(RFC822)")
+        # Download unread emails in batches, one FETCH per batch
+        for start in range(0, len(email_ids), FETCH_BATCH_SIZE):
+            batch = email_ids[start:start + FETCH_BATCH_SIZE]
+            status, msg_data = mail.fetch(b",".join(batch), "(RFC822)")
             if status != "OK":
                 continue
             
-            # Parse the raw email data
-            raw_email = msg_data[0][1]
-            msg = email.message_from_bytes(raw_email)
-            
-            # Extract sender email address
-            sender = decode_mime_header(msg.get("From", ""))
-            sender_email = ""
-            if "<" in sender and ">" in sender:
-                # Format: "Name <email@example.com>"
-                sender_email = sender.split("<")[1].split(">")[0]
-            else:
-                # Format: "email@example.com"
-                sender_email = sender
-            
-            # Extract other fields
-            subject = decode_mime_header(msg.get("Subject", ""))
-            message_id = msg.get("Message-ID", "").strip("<>")
-            in_reply_to = msg.get("In-Reply-To", "").strip("<>") if msg.get("In-Reply-To") else None
-            thread_id = extract_thread_id(msg)
-            body = extract_email_body(msg)
-            
-            # Parse the date header
-            date_str = msg.get("Date", "")
-            try:
-                received_at = email.utils.parsedate_to_datetime(date_str)
-            except:
-                received_at = datetime.utcnow()
-            
-            # Add to results
-            emails_data.append({
-                "sender_email": sender_email,
-                "subject": subject,
-                "body": body,
-                "message_id": message_id,
-                "in_reply_to": in_reply_to,
-                "thread_id": thread_id or message_id,  # Use message_id if no thread
-                "received_at": received_at,
-            })
+            # The response interleaves (envelope, raw email) tuples with
+            # closing b")" markers; only the tuples carry messages
+            for part in msg_data:
+                if isinstance(part, tuple):
+                    emails_data.append(parse_email(part[1]))
         
         # Disconnect cleanly
         mail.logout()
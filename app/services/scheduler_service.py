@@ -48,6 +48,9 @@ _executor = ThreadPoolExecutor(max_workers=2)  # For running sync tasks
 MIN_INTERVAL_MINUTES = 1   # Don't fetch more than once per minute
 MAX_INTERVAL_MINUTES = 60  # Fetch at least once per hour
 
+# Tickets loaded and committed together during AI processing
+AI_BATCH_SIZE = 100
+
 
 def get_scheduler_status():
     """
@@ -65,6 +68,102 @@ def get_scheduler_status():
     }
 
 
+def process_unprocessed_tickets(db) -> int:
+    """
+    Run AI processing over every ticket that hasn't been processed yet.
+    
+    Tickets are loaded AI_BATCH_SIZE at a time, ordered by id, so a large
+    backlog never has to sit in memory at once. For each batch the latest
+    incoming message of every ticket is fetched in one query.
+    
+    Each ticket is committed as soon as its AI results are in, so a crash
+    part-way through a batch doesn't throw away OpenAI calls already paid
+    for. Urgent-ticket notifications are only sent after that commit
+    succeeds.
+    
+    Tickets without an incoming message, or whose AI call fails, stay
+    unprocessed and are retried on the next run.
+    
+    Returns:
+        Number of tickets successfully processed
+    """
+    from app.services.ai_service import process_ticket
+    from app.services.sla_service import update_ticket_sla
+    from app.services.email_notification_service import send_urgent_ticket_notification
+    from app.models import Ticket, TicketMessage
+    from sqlalchemy import desc, select
+    
+    processed = 0
+    last_id = 0
+    
+    while True:
+        # Keyset pagination: commits between batches don't disturb the next query
+        batch = db.query(Ticket).filter(
+            Ticket.ai_processed == False,
+            Ticket.id > last_id
+        ).order_by(Ticket.id).limit(AI_BATCH_SIZE).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        
+        # Latest incoming message body per ticket (DISTINCT ON ticket_id)
+        latest_bodies = dict(db.execute(
+            select(TicketMessage.ticket_id, TicketMessage.body)
+            .where(
+                TicketMessage.ticket_id.in_([t.id for t in batch]),
+                TicketMessage.is_incoming == True
+            )
+            .distinct(TicketMessage.ticket_id)
+            .order_by(TicketMessage.ticket_id, desc(TicketMessage.created_at))
+        ).all())
+        
+        for ticket in batch:
+            if ticket.id not in latest_bodies:
+                continue
+            
+            try:
+                # Send to AI for processing
+                result = process_ticket(
+                    ticket_id=ticket.id,
+                    sender_email=ticket.sender_email,
+                    subject=ticket.subject,
+                    body=latest_bodies[ticket.id],
+                    received_at=str(ticket.received_at),
+                    db=db
+                )
+                
+                if not result:
+                    continue
+                
+                # Update ticket with AI results
+                ticket.category = result["category"]
+                ticket.urgency = result["urgency"]
+                ticket.summary = result["summary"]
+                ticket.fix_steps = result["fix_steps"]
+                ticket.draft_response = result["draft_response"]
+                ticket.ai_processed = True
+                
+                # Update SLA and save this ticket's results
+                update_ticket_sla(db, ticket, commit=False)
+                db.commit()
+                processed += 1
+            except Exception as e:
+                db.rollback()
+                print(f"[Scheduler] Error processing ticket {ticket.id}: {e}")
+                continue
+            
+            # Only notify about results that were actually saved
+            try:
+                send_urgent_ticket_notification(db, ticket)
+            except Exception as e:
+                print(f"[Scheduler] Error sending notification for ticket {ticket.id}: {e}")
+        
+        # Release the batch's objects so memory stays flat on large backlogs
+        db.expunge_all()
+    
+    return processed
+
+
 def _fetch_and_process_emails_sync():
     """
     Synchronously fetch and process all emails.
@@ -85,11 +184,8 @@ def _fetch_and_process_emails_sync():
     # Import here to avoid circular imports
     from app.database import SessionLocal
     from app.services.imap_service import fetch_unread_emails
-    from app.services.ai_service import process_ticket
-    from app.services.sla_service import update_ticket_sla
-    from app.services.email_notification_service import send_urgent_ticket_notification
     from app.models import Ticket, TicketMessage
-    from sqlalchemy import desc
+    from sqlalchemy import tuple_
     
     # Create a new database session for this background task
     db = SessionLocal()
@@ -97,20 +193,27 @@ def _fetch_and_process_emails_sync():
         # Step 1: Fetch emails from IMAP
         emails = fetch_unread_emails(db)
         created = 0
-        processed = 0
         
         # Step 2: Create tickets or add to existing threads
+        # Find existing tickets for every (sender, subject) in one query
+        keys = {(e["sender_email"], e["subject"]) for e in emails}
+        existing_by_key = {}
+        if keys:
+            for ticket in db.query(Ticket).filter(
+                tuple_(Ticket.sender_email, Ticket.subject).in_(keys)
+            ).order_by(Ticket.id):
+                existing_by_key.setdefault((ticket.sender_email, ticket.subject), ticket)
+        
         for email_data in emails:
+            key = (email_data["sender_email"], email_data["subject"])
+            
             # Check if this is a reply to an existing ticket
-            existing = db.query(Ticket).filter(
-                Ticket.sender_email == email_data["sender_email"],
-                Ticket.subject == email_data["subject"]
-            ).first()
+            existing = existing_by_key.get(key)
             
             if existing:
                 # Add as new message to existing ticket
                 message = TicketMessage(
-                    ticket_id=existing.id,
+                    ticket=existing,
                     sender_email=email_data["sender_email"],
                     subject=email_data["subject"],
                     body=email_data["body"],
@@ -118,69 +221,29 @@ def _fetch_and_process_emails_sync():
                 )
                 db.add(message)
             else:
-                # Create new ticket
+                # Create new ticket with its initial message; both are
+                # inserted by the single commit below
                 ticket = Ticket(
                     sender_email=email_data["sender_email"],
                     subject=email_data["subject"],
                     thread_id=email_data.get("thread_id"),
                     received_at=email_data.get("received_at", datetime.utcnow())
                 )
-                db.add(ticket)
-                db.flush()  # Get the ticket ID
-                
-                # Create the initial message
-                message = TicketMessage(
-                    ticket_id=ticket.id,
+                ticket.messages.append(TicketMessage(
                     sender_email=email_data["sender_email"],
                     subject=email_data["subject"],
                     body=email_data["body"],
                     is_incoming=True
-                )
-                db.add(message)
+                ))
+                db.add(ticket)
+                existing_by_key[key] = ticket
                 created += 1
         
         db.commit()
         
         # Step 3: Process unprocessed tickets with AI
-        unprocessed = db.query(Ticket).filter(Ticket.ai_processed == False).all()
-        for ticket in unprocessed:
-            # Get the latest incoming message
-            latest_message = db.query(TicketMessage).filter(
-                TicketMessage.ticket_id == ticket.id,
-                TicketMessage.is_incoming == True
-            ).order_by(desc(TicketMessage.created_at)).first()
-            
-            if not latest_message:
-                continue
-            
-            try:
-                # Send to AI for processing
-                result = process_ticket(
-                    ticket_id=ticket.id,
-                    sender_email=ticket.sender_email,
-                    subject=ticket.subject,
-                    body=latest_message.body,
-                    received_at=str(ticket.received_at),
-                    db=db
-                )
-                
-                if result:
-                    # Update ticket with AI results
-                    ticket.category = result["category"]
-                    ticket.urgency = result["urgency"]
-                    ticket.summary = result["summary"]
-                    ticket.fix_steps = result["fix_steps"]
-                    ticket.draft_response = result["draft_response"]
-                    ticket.ai_processed = True
-                    processed += 1
-                    
-                    # Update SLA and send notifications
-                    update_ticket_sla(db, ticket)
-                    send_urgent_ticket_notification(db, ticket)
-            except Exception as e:
-                print(f"[Scheduler] Error processing ticket {ticket.id}: {e}")
+        processed = process_unprocessed_tickets(db)
         
-        db.commit()
         print(f"[Scheduler] Fetched {len(emails)} emails, created {created} tickets, processed {processed} at {datetime.now()}")
         return len(emails), created, processed
     except Exception as e:
@@ -0,0 +1,97 @@
+"""
+Settings Service Module
+=======================
+Cached access to the key/value Settings table.
+
+Settings are read on almost every request (SMTP/IMAP credentials, Slack
+flags, SLA hours, ...) but only change when someone saves the Settings
+page. Instead of querying the table each time, the whole table is loaded
+with one query and kept in memory for SETTINGS_CACHE_TTL seconds
+(default 60).
+
+USAGE:
+    from app.services.settings_service import get_setting, get_all_settings, save_settings
+    host = get_setting(db, "imap_host")
+    settings = get_all_settings(db)      # read-only mapping of every key
+    save_settings(db, {"imap_host": "imap.example.com"})   # upsert + commit
+
+Writes should go through save_settings(), which commits and clears the
+cache. Anything that writes to the Settings table another way must call
+invalidate_settings_cache() after committing.
+
+MULTIPLE WORKERS:
+The cache is per process. A worker that saves a setting clears its own
+cache immediately; other workers pick the change up within the TTL.
+
+TROUBLESHOOTING:
+- Setting change not taking effect: wait SETTINGS_CACHE_TTL seconds, or
+  lower it (0 disables caching)
+"""
+
+import os
+import threading
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+
+from cachetools import TTLCache
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models import Settings, utc_now
+
+SETTINGS_CACHE_TTL = int(os.environ.get("SETTINGS_CACHE_TTL", 60))
+
+_ALL_SETTINGS = "all"
+_cache: TTLCache = TTLCache(maxsize=1, ttl=SETTINGS_CACHE_TTL)
+_cache_lock = threading.Lock()
+# Bumped on every invalidation so a load that raced with a write is not cached
+_generation = 0
+
+
+def get_all_settings(db: Session) -> Mapping[str, Optional[str]]:
+    """Return every setting as a read-only key -> value mapping."""
+    with _cache_lock:
+        cached = _cache.get(_ALL_SETTINGS)
+        generation = _generation
+    if cached is not None:
+        return cached
+
+    rows = db.execute(select(Settings.key, Settings.value)).all()
+    settings = MappingProxyType({key: value for key, value in rows})
+
+    if SETTINGS_CACHE_TTL > 0:
+        with _cache_lock:
+            if generation == _generation:
+                _cache[_ALL_SETTINGS] = settings
+    return settings
+
+
+def get_setting(db: Session, key: str) -> Optional[str]:
+    """Return a single setting value, or None if it has never been saved."""
+    return get_all_settings(db).get(key)
+
+
+def invalidate_settings_cache():
+    """Drop the cached settings; call after committing any Settings change."""
+    global _generation
+    with _cache_lock:
+        _cache.clear()
+        _generation += 1
+
+
+def save_settings(db: Session, values: Dict[str, str]):
+    """
+    Insert or update several settings with one statement, commit, and clear the cache.
+    
+    Uses INSERT ... ON CONFLICT (key) DO UPDATE, so no SELECT is needed to
+    find out which keys already exist.
+    """
+    if values:
+        stmt = pg_insert(Settings).values([{"key": k, "value": v} for k, v in values.items()])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[Settings.key],
+            set_={"value": stmt.excluded.value, "updated_at": utc_now()}
+        ))
+    db.commit()
+    invalidate_settings_cache()
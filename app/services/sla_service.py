@@ -1,8 +1,9 @@
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import desc, text
 
-from app.models import Ticket, Settings
+from app.models import Ticket
+from app.services.settings_service import get_all_settings
 
 
 SLA_HOURS = {
@@ -19,9 +20,7 @@ PRIORITY_WEIGHTS = {
 
 
 def get_sla_hours(db: Session) -> dict:
-    settings_keys = ["sla_hours_high", "sla_hours_medium", "sla_hours_low"]
-    settings = db.query(Settings).filter(Settings.key.in_(settings_keys)).all()
-    settings_dict = {s.key: s.value for s in settings}
+    settings_dict = get_all_settings(db)
     
     return {
         "High": int(settings_dict.get("sla_hours_high", SLA_HOURS["High"])),
@@ -59,7 +58,7 @@ def calculate_priority_score(ticket: Ticket) -> int:
     return base_score
 
 
-def update_ticket_sla(db: Session, ticket: Ticket):
+def update_ticket_sla(db: Session, ticket: Ticket, commit: bool = True):
     if ticket.urgency and ticket.received_at:
         ticket.sla_deadline = calculate_sla_deadline(db, ticket.urgency, ticket.received_at)
     
@@ -69,44 +68,81 @@ def update_ticket_sla(db: Session, ticket: Ticket):
         if not ticket.sent_at:
             ticket.sla_breached = True
     
-    db.commit()
+    if commit:
+        db.commit()
+
+
+# Recomputes sla_deadline, sla_breached and priority_score for every active
+# ticket in one statement. Mirrors calculate_sla_deadline() and
+# calculate_priority_score(); keep the two in sync. The score depends on the
+# current time, so it can't be a generated column and is refreshed here.
+_UPDATE_ALL_SLA_SQL = text("""
+WITH old AS (
+    SELECT
+        id,
+        sla_deadline AS old_deadline,
+        COALESCE(sla_breached, false) AS old_breached,
+        (COALESCE(urgency, '') <> '' AND received_at IS NOT NULL) AS has_sla,
+        CASE
+            WHEN COALESCE(urgency, '') <> '' AND received_at IS NOT NULL
+            THEN received_at + make_interval(hours => CASE urgency
+                WHEN 'High' THEN :hours_high
+                WHEN 'Medium' THEN :hours_medium
+                WHEN 'Low' THEN :hours_low
+                ELSE 24 END)
+            ELSE sla_deadline
+        END AS new_deadline
+    FROM tickets
+    WHERE sent_at IS NULL AND approval_status <> 'REJECTED'
+),
+upd AS (
+    UPDATE tickets t SET
+        sla_deadline = old.new_deadline,
+        sla_breached = CASE WHEN old.has_sla THEN :now > old.new_deadline ELSE t.sla_breached END,
+        priority_score =
+            CASE t.urgency WHEN 'High' THEN 100 WHEN 'Medium' THEN 50 ELSE 10 END
+            + COALESCE(trunc(extract(epoch FROM (:now - t.received_at)) / 3600 * 2)::int, 0)
+            + CASE
+                WHEN old.new_deadline IS NULL THEN 0
+                WHEN old.new_deadline < :now THEN 200
+                WHEN old.new_deadline < :now + interval '2 hours' THEN 100
+                WHEN old.new_deadline < :now + interval '4 hours' THEN 50
+                ELSE 0
+              END
+            + CASE WHEN t.escalation_required THEN 75 ELSE 0 END
+    FROM old
+    WHERE t.id = old.id
+    RETURNING
+        old.old_deadline IS DISTINCT FROM t.sla_deadline AS recalculated,
+        old.has_sla AND t.sla_breached AND NOT old.old_breached AS newly_breached
+)
+SELECT
+    count(*),
+    count(*) FILTER (WHERE recalculated),
+    count(*) FILTER (WHERE newly_breached)
+FROM upd
+""")
 
 
 def update_all_sla_status(db: Session):
-    pending_tickets = db.query(Ticket).filter(
-        Ticket.sent_at.is_(None),
-        Ticket.approval_status != "REJECTED"
-    ).all()
-    
-    breached_count = 0
-    recalculated_count = 0
-    now = datetime.utcnow()
-    
-    for ticket in pending_tickets:
-        if ticket.urgency and ticket.received_at:
-            new_deadline = calculate_sla_deadline(db, ticket.urgency, ticket.received_at)
-            if ticket.sla_deadline != new_deadline:
-                ticket.sla_deadline = new_deadline
-                recalculated_count += 1
-            
-            if now > ticket.sla_deadline:
-                if not ticket.sla_breached:
-                    ticket.sla_breached = True
-                    breached_count += 1
-            else:
-                if ticket.sla_breached:
-                    ticket.sla_breached = False
-        
-        ticket.priority_score = calculate_priority_score(ticket)
+    # One UPDATE in the database instead of loading every active ticket
+    sla_hours = get_sla_hours(db)
+    updated, recalculated_count, breached_count = db.execute(_UPDATE_ALL_SLA_SQL, {
+        "now": datetime.utcnow(),
+        "hours_high": sla_hours["High"],
+        "hours_medium": sla_hours["Medium"],
+        "hours_low": sla_hours["Low"],
+    }).one()
     
     db.commit()
-    return {"updated": len(pending_tickets), "recalculated": recalculated_count, "newly_breached": breached_count}
+    return {"updated": updated, "recalculated": recalculated_count, "newly_breached": breached_count}
 
 
 def get_priority_queue(db: Session, limit: int = 20):
     update_all_sla_status(db)
     
-    tickets = db.query(Ticket).filter(
+    # Assignees are part of the response; load them in one query, not one per ticket
+    tickets = db.query(Ticket).options(selectinload(Ticket.assignee)).filter(
         Ticket.sent_at.is_(None),
         Ticket.approval_status != "REJECTED"
     ).order_by(desc(Ticket.priority_score)).limit(limit).all()
@@ -1,18 +1,19 @@
-import os
 import json
 from typing import Optional
 import urllib.request
 import urllib.error
 
+from app import config
+
 
 def get_slack_webhook_url(db=None) -> Optional[str]:
     if db:
-        from app.models import Settings
-        setting = db.query(Settings).filter(Settings.key == "slack_webhook_url").first()
-        if setting and setting.value:
-            return setting.value
+        from app.services.settings_service import get_setting
+        webhook_url = get_setting(db, "slack_webhook_url")
+        if webhook_url:
+            return webhook_url
     
-    return os.environ.get("SLACK_WEBHOOK_URL")
+    return config.SLACK_WEBHOOK_URL
 
 
 def send_slack_notification(
@@ -113,9 +114,8 @@ def notify_ticket_processed(db, ticket) -> bool:
     if not webhook_url:
         return False
     
-    from app.models import Settings
-    notify_on_process = db.query(Settings).filter(Settings.key == "slack_notify_on_process").first()
-    if not notify_on_process or notify_on_process.value != "true":
+    from app.services.settings_service import get_setting
+    if get_setting(db, "slack_notify_on_process") != "true":
         return False
     
     return send_slack_notification(
@@ -20,6 +20,16 @@ Settings can be provided via database (Settings table) or environment variables:
 - SMTP_PASSWORD: Email account password or app-specific password
 - SMTP_FROM_EMAIL: Sender email address (shown as "From")
 
+CONNECTION REUSE:
+Connecting means DNS + TCP + STARTTLS + AUTH, often several hundred ms.
+After a send, the logged-in connection is kept open (up to
+SMTP_POOL_SIZE of them, default 2) and reused by the next send with the
+same server and credentials, so e.g. a notification to five recipients
+logs in once. Connections idle for longer than SMTP_IDLE_TIMEOUT seconds
+(default 240, below most servers' own idle cut-off) are closed instead
+of reused, and a connection the server dropped anyway is replaced
+transparently.
+
 THREADING:
 To maintain email threads (conversation grouping in email clients),
 we set In-Reply-To and References headers when responding to tickets.
@@ -29,13 +39,27 @@ TROUBLESHOOTING:
 - Connection errors: Check hostname and port; ensure firewall allows access
 - Authentication failures: For Gmail, use an App Password
 - Emails going to spam: Check DKIM/SPF settings for your domain
+- "421 timeout" / disconnected errors in the log: lower SMTP_IDLE_TIMEOUT
 """
 
+import os
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional
-import os
+from typing import List, Optional, Tuple
+
+from app import config
+
+SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", 2))
+SMTP_IDLE_TIMEOUT = int(os.environ.get("SMTP_IDLE_TIMEOUT", 240))
+
+# Idle, logged-in connections: (server key, connection, time returned).
+# The key holds the credentials, so a settings change never reuses a
+# connection logged in with the old ones.
+_idle_connections: List[Tuple[tuple, smtplib.SMTP, float]] = []
+_pool_lock = threading.Lock()
 
 
 def get_smtp_config(db=None):
@@ -58,23 +82,74 @@ def get_smtp_config(db=None):
     """
     # Try database settings first
     if db:
-        from app.models import Settings
-        settings = {s.key: s.value for s in db.query(Settings).all()}
+        from app.services.settings_service import get_all_settings
+        settings = get_all_settings(db)
         host = settings.get("smtp_host")
         port = int(settings.get("smtp_port") or "587")
         username = settings.get("smtp_username")
         password = settings.get("smtp_password")
         from_email = settings.get("smtp_from_email")
-        if all([host, username, password, from_email]):
+        if host and username and password and from_email:
             return host, port, username, password, from_email
     
-    # Fall back to environment variables
-    host = os.environ.get("SMTP_HOST", "")
-    port = int(os.environ.get("SMTP_PORT", "587"))
-    username = os.environ.get("SMTP_USERNAME", "")
-    password = os.environ.get("SMTP_PASSWORD", "")
-    from_email = os.environ.get("SMTP_FROM_EMAIL", "")
-    return host, port, username, password, from_email
+    # Fall back to environment variables (read once at startup by app.config)
+    return config.SMTP_HOST, config.SMTP_PORT, config.SMTP_USERNAME, config.SMTP_PASSWORD, config.SMTP_FROM_EMAIL
+
+
+def _connect(host: str, port: int, username: str, password: str) -> smtplib.SMTP:
+    server = smtplib.SMTP(host, port)
+    try:
+        # Upgrade to TLS for security, then authenticate
+        server.starttls()
+        server.login(username, password)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def _quit(server: smtplib.SMTP):
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+
+def _checkout(key: tuple) -> Optional[smtplib.SMTP]:
+    """Take a reusable idle connection for this server/login, if there is one."""
+    stale = []
+    found = None
+    now = time.monotonic()
+    with _pool_lock:
+        for entry in list(_idle_connections):
+            entry_key, server, returned_at = entry
+            if now - returned_at > SMTP_IDLE_TIMEOUT:
+                _idle_connections.remove(entry)
+                stale.append(server)
+            elif found is None and entry_key == key:
+                _idle_connections.remove(entry)
+                found = server
+    for server in stale:
+        _quit(server)
+    return found
+
+
+def _checkin(key: tuple, server: smtplib.SMTP):
+    """Keep a healthy connection for the next send, or close it if the pool is full."""
+    with _pool_lock:
+        if len(_idle_connections) < SMTP_POOL_SIZE:
+            _idle_connections.append((key, server, time.monotonic()))
+            return
+    _quit(server)
+
+
+def close_smtp_connections():
+    """Close every idle pooled connection (called on shutdown)."""
+    with _pool_lock:
+        servers = [server for _, server, _ in _idle_connections]
+        _idle_connections.clear()
+    for server in servers:
+        _quit(server)
 
 
 def send_email(
@@ -123,7 +198,7 @@ def send_email(
     host, port, username, password, from_email = get_smtp_config(db)
     
     # Check if SMTP is properly configured
-    if not all([host, username, password, from_email]):
+    if not (host and username and password and from_email):
         print("SMTP not configured")
         return False
     
@@ -145,14 +220,28 @@ def send_email(
         # Attach the body as plain text
         msg.attach(MIMEText(body, 'plain'))
         
-        # Connect and send
-        with smtplib.SMTP(host, port) as server:
-            # Upgrade to TLS for security
-            server.starttls()
-            # Authenticate
-            server.login(username, password)
-            # Send the message
-            server.send_message(msg)
+        # Send over a pooled connection when one is open, else log in afresh.
+        # A pooled connection the server has since closed fails before
+        # anything is sent, so the message is retried once on a new one.
+        key = (host, port, username, password)
+        server = _checkout(key)
+        if server is not None:
+            try:
+                server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                server.close()
+                server = None
+            except Exception:
+                _quit(server)
+                raise
+        if server is None:
+            server = _connect(host, port, username, password)
+            try:
+                server.send_message(msg)
+            except Exception:
+                _quit(server)
+                raise
+        _checkin(key, server)
         
         return True
     except Exception as e:
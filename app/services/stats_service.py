@@ -0,0 +1,161 @@
+"""
+Stats Service Module
+====================
+Pre-aggregated ticket statistics for the analytics charts.
+
+Counting tickets by category, urgency and day means scanning the whole
+tickets table. Instead, the counts are kept in a PostgreSQL materialized
+view (ticket_daily_stats) with one row per day/category/urgency/status,
+and the analytics endpoints sum those rows.
+
+The view is refreshed in the background every STATS_REFRESH_SECONDS
+(default 300), so analytics may lag behind the live tickets table by up
+to that long. The time of the last refresh is stored in the Settings table
+(stats_refreshed_at) and returned by the endpoints as last_refreshed_at.
+
+ARCHITECTURE:
+- ticket_daily_stats: Read-only Core table describing the view's columns
+- create_stats_view(): Creates the view and its unique index if missing
+- refresh_stats_view(): REFRESH MATERIALIZED VIEW CONCURRENTLY
+- start_stats_refresher(): Background thread calling refresh_stats_view()
+
+NULL category/urgency/status values are stored as '' in the view (and
+tickets without received_at under 1970-01-01), because a concurrent
+refresh needs a unique index over plain columns.
+
+TROUBLESHOOTING:
+- "relation ticket_daily_stats does not exist": The view is created with the
+  other tables on startup; it is skipped when DB_CREATE_ALL=0, so run
+  create_stats_view() once (or restart with DB_CREATE_ALL=1)
+- Analytics not updating: Check the [Stats] log lines; lower
+  STATS_REFRESH_SECONDS if five minutes is too stale
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Column, Date, Integer, MetaData, String, Table, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Settings
+
+STATS_REFRESH_SECONDS = int(os.environ.get("STATS_REFRESH_SECONDS", 300))
+
+# Settings key holding the ISO timestamp of the last successful refresh
+REFRESHED_AT_KEY = "stats_refreshed_at"
+
+# Arbitrary constant for the advisory lock that stops workers refreshing at once
+REFRESH_LOCK_ID = 727002
+
+# Kept on its own MetaData so Base.metadata.create_all() never tries to
+# create a real table with this name
+ticket_daily_stats = Table(
+    "ticket_daily_stats",
+    MetaData(),
+    Column("day", Date),
+    Column("category", String(50)),
+    Column("urgency", String(20)),
+    Column("approval_status", String(20)),
+    Column("ticket_count", Integer),
+    Column("breached_count", Integer),
+    Column("sent_count", Integer),
+    Column("ai_processed_count", Integer),
+)
+
+CREATE_VIEW_SQL = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS ticket_daily_stats AS
+SELECT
+    COALESCE(received_at::date, DATE '1970-01-01') AS day,
+    COALESCE(category, '') AS category,
+    COALESCE(urgency, '') AS urgency,
+    COALESCE(approval_status, '') AS approval_status,
+    COUNT(*) AS ticket_count,
+    COUNT(*) FILTER (WHERE sla_breached) AS breached_count,
+    COUNT(*) FILTER (WHERE sent_at IS NOT NULL) AS sent_count,
+    COUNT(*) FILTER (WHERE ai_processed) AS ai_processed_count
+FROM tickets
+GROUP BY 1, 2, 3, 4
+"""
+
+# REFRESH ... CONCURRENTLY requires a unique index on the view
+CREATE_INDEX_SQL = """
+CREATE UNIQUE INDEX IF NOT EXISTS ix_ticket_daily_stats_key
+ON ticket_daily_stats (day, category, urgency, approval_status)
+"""
+
+_refresher_thread: Optional[threading.Thread] = None
+_stop_event = threading.Event()
+
+
+def create_stats_view(bind):
+    """
+    Create the ticket_daily_stats view and its unique index if missing.
+
+    Safe to run multiple times. Must run after the tickets table exists.
+    """
+    with bind.begin() as conn:
+        conn.execute(text(CREATE_VIEW_SQL))
+        conn.execute(text(CREATE_INDEX_SQL))
+
+
+def refresh_stats_view():
+    """
+    Recompute the view without blocking readers.
+
+    Only one worker refreshes at a time; the others skip this round.
+    """
+    db = SessionLocal()
+    try:
+        got_lock = db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:lock_id)"), {"lock_id": REFRESH_LOCK_ID}
+        ).scalar()
+        if not got_lock:
+            return
+        db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY ticket_daily_stats"))
+        stmt = pg_insert(Settings.__table__).values(
+            key=REFRESHED_AT_KEY, value=datetime.utcnow().isoformat()
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["key"], set_={"value": stmt.excluded.value}
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def get_last_refreshed_at(db: Session) -> Optional[str]:
+    """Return the ISO timestamp of the last refresh, or None if never refreshed."""
+    return db.execute(
+        select(Settings.value).where(Settings.key == REFRESHED_AT_KEY)
+    ).scalar_one_or_none()
+
+
+def _refresher_loop():
+    while not _stop_event.wait(timeout=STATS_REFRESH_SECONDS):
+        try:
+            refresh_stats_view()
+        except Exception as e:
+            print(f"[Stats] Error refreshing ticket_daily_stats: {e}")
+    print("[Stats] Refresher stopped")
+
+
+def start_stats_refresher():
+    """Start the background refresh thread (no-op if already running)."""
+    global _refresher_thread
+
+    if _refresher_thread and _refresher_thread.is_alive():
+        return
+
+    _stop_event.clear()
+    _refresher_thread = threading.Thread(target=_refresher_loop, daemon=True)
+    _refresher_thread.start()
+    print(f"[Stats] Refreshing ticket_daily_stats every {STATS_REFRESH_SECONDS} seconds")
+
+
+def stop_stats_refresher():
+    """Signal the refresh thread to stop."""
+    _stop_event.set()